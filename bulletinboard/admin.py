@@ -1,17 +1,56 @@
-import datetime
-
 from django.contrib import admin
 from django.utils import timezone
 
-from .models import Profile, Category, Post, Comment
+from .archive import archive_cutoff, archive_posts
+from .cache import invalidate_tags
+from .feed import home_feed
+from .jobs import retry
+from .models import Profile, Category, Post, Comment, Job, ArchivedPost
 
-admin.site.register(Profile)
 admin.site.register(Category)
-admin.site.register(Comment)
 
 
-def delete_old_announcement(modeladmin, request, queryset):
-    queryset.filter(date_pub__lte=timezone.now() - datetime.timedelta(weeks=16)).delete()
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_select_related = ('user',)
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_select_related = ('author',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    ordering = ('-id',)
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'finished_at', 'last_error')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        self.message_user(request, '{} jobs queued again'.format(retry(queryset)))
+    retry_jobs.short_description = 'Retry selected dead jobs'
+
+
+def archive_old_announcements(modeladmin, request, queryset):
+    moved = archive_posts(queryset, older_than=archive_cutoff())
+    modeladmin.message_user(request, '{} old announcements archived'.format(moved))
+archive_old_announcements.short_description = 'Archive selected announcements older than 16 weeks'
+
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ('id', 'announcement_title', 'published_date', 'archived_at')
+    list_select_related = ('author', 'category')
+    ordering = ('-published_date', '-id')
+    search_fields = ['announcement_title']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -23,12 +62,19 @@ class PostAdmin(admin.ModelAdmin):
     readonly_fields = ['published_date']
     list_display = ('author', 'announcement_title', 'published_date')
     list_filter = ('published_date', 'category')
-    search_fields = ['author', 'announcement_title']
-    actions = [delete_old_announcement, 'pub_now']
+    list_select_related = ('author', 'category')
+    ordering = ('-published_date', '-id')
+    search_fields = ['author__username', 'announcement_title']
+    actions = [archive_old_announcements, 'pub_now']
 
     @staticmethod
     def pub_now(modeladmin, request, queryset):
-        queryset.update(published_date=timezone.now())
+        categories = set(queryset.values_list('category_id', flat=True))
+        now = timezone.now()
+        # cached cards are keyed by updated_at
+        queryset.update(published_date=now, updated_at=now)
+        invalidate_tags('home', 'categories', *['category:{}'.format(pk) for pk in categories])
+        home_feed.changed()
 
 
 admin.site.register(Post, PostAdmin)
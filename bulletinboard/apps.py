@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class BulletinboardConfig(AppConfig):
     name = 'bulletinboard'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import signals
+        from .sqlite import configure_connection
+
+        post_migrate.connect(signals.restore_search_triggers, sender=self)
+        connection_created.connect(configure_connection)
\ No newline at end of file
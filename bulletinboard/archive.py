@@ -0,0 +1,99 @@
+import collections
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_tags
+from .counters import increment
+from .feed import home_feed
+from .models import ArchivedComment, ArchivedPost, Category, Comment, Post
+from .storage import release_blob
+
+POST_FIELDS = ('id', 'author_id', 'announcement_title', 'description', 'announcement_image', 'category_id',
+               'published_date', 'updated_at', 'price', 'comment_count', 'external_id')
+COMMENT_FIELDS = ('id', 'author_id', 'text', 'in_post_id', 'date_publish')
+
+
+def archive_cutoff(weeks=None):
+    weeks = getattr(settings, 'ARCHIVE_AFTER_WEEKS', 16) if weeks is None else weeks
+    return timezone.now() - datetime.timedelta(weeks=weeks)
+
+
+def _raw_delete(queryset):
+    # QuerySet.delete() loads every row to send signals and follow cascades; the archive
+    # keeps counters and blob references itself, so rows are deleted by one statement
+    return queryset._raw_delete(queryset.db)
+
+
+def archive_batch(ids):
+    '''
+        move the posts ``ids`` and their comments into the archive tables, keeping their ids.
+
+        Image references move with the rows, so blobs stay on disk until purge_archive.
+    '''
+    with transaction.atomic():
+        posts = list(Post.objects.filter(id__in=ids).values(*POST_FIELDS))
+        ArchivedPost.objects.bulk_create([ArchivedPost(**values) for values in posts])
+        comments = Comment.objects.filter(in_post_id__in=ids).order_by('id').values(*COMMENT_FIELDS)
+        ArchivedComment.objects.bulk_create((ArchivedComment(**values) for values in comments.iterator()),
+                                            batch_size=1000)
+        _raw_delete(Comment.objects.filter(in_post_id__in=ids))
+        _raw_delete(Post.objects.filter(id__in=ids))
+        categories = collections.Counter(values['category_id'] for values in posts)
+        for category_id, count in categories.items():
+            increment(Category, category_id, 'post_count', -count)
+    if categories:
+        invalidate_tags('home', 'categories', *['category:{}'.format(pk) for pk in categories])
+        home_feed.changed()
+    return len(posts)
+
+
+def archive_posts(queryset=None, older_than=None, batch_size=500, pause=0):
+    '''
+        archive posts published before ``older_than`` in transactions of ``batch_size``
+        posts, oldest first; returns how many were moved
+    '''
+    queryset = Post.objects.all() if queryset is None else queryset
+    due = queryset.filter(published_date__lt=older_than or archive_cutoff()).order_by('published_date', 'id')
+    total = 0
+    while True:
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += archive_batch(ids)
+        if pause:
+            # lets other writers take SQLite's lock between batches
+            time.sleep(pause)
+
+
+def purge_batch(ids):
+    '''
+        delete archived posts ``ids`` with their comments, releasing their images
+    '''
+    with transaction.atomic():
+        images = list(ArchivedPost.objects.filter(id__in=ids).values_list('announcement_image', flat=True))
+        _raw_delete(ArchivedComment.objects.filter(in_post_id__in=ids))
+        deleted = _raw_delete(ArchivedPost.objects.filter(id__in=ids))
+        # files are removed once the transaction commits and nothing else refers to them
+        for name in images:
+            if name:
+                release_blob(name)
+    return deleted
+
+
+def purge_archive(older_than, batch_size=100, pause=0):
+    '''
+        delete archived posts published before ``older_than`` in small transactions
+    '''
+    due = ArchivedPost.objects.filter(published_date__lt=older_than).order_by('published_date', 'id')
+    total = 0
+    while True:
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += purge_batch(ids)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,273 @@
+import gzip
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .images import WEBP_FORMAT, derivative_formats
+
+try:
+    import brotli
+except ImportError:
+    # .br siblings are skipped, browsers get the gzip ones
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.json', '.map', '.html', '.xml', '.ico')
+IMAGES = ('.jpg', '.jpeg', '.png')
+# what a sibling has to save to be worth a negotiation
+MIN_SAVING = 0.05
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+
+IMPORT_RE = re.compile(r'''@import\s+(?:url\(\s*)?["']?([^"')\s]+)["']?\s*\)?\s*;''')
+URL_RE = re.compile(r'''url\(\s*["']?([^"')]+)["']?\s*\)''')
+
+
+def minify_css(css):
+    '''
+        drop comments and the whitespace css does not need; quoted strings are not special
+        cased, the stylesheets of this app have none that would change
+    '''
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def _rebase(css, source, target):
+    # urls of an inlined stylesheet are relative to where it lived
+    def replace(match):
+        url = match.group(1)
+        if url.startswith(('/', 'data:', '#')) or '//' in url:
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return 'url("{}")'.format(posixpath.relpath(path, posixpath.dirname(target) or '.'))
+    return URL_RE.sub(replace, css)
+
+
+def bundle_css(name, read, seen=None):
+    '''
+        the stylesheet ``name`` with its relative @imports inlined, recursively;
+        ``read(name)`` returns the text of a stylesheet or None when it is unknown
+    '''
+    seen = set() if seen is None else seen
+    seen.add(name)
+
+    def replace(match):
+        url = match.group(1)
+        imported = posixpath.normpath(posixpath.join(posixpath.dirname(name), url))
+        if '//' in url or imported in seen or read(imported) is None:
+            return match.group(0)
+        return _rebase(bundle_css(imported, read, seen), imported, name)
+    return IMPORT_RE.sub(replace, read(name))
+
+
+def optimize_image(content, extension):
+    '''
+        ``content`` re-encoded losslessly for PNG and with the original quantization
+        tables for JPEG, or None when that is not smaller
+    '''
+    image = Image.open(io.BytesIO(content))
+    buffer = io.BytesIO()
+    if extension == '.png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'JPEG', quality='keep', optimize=True, progressive=True)
+    optimized = buffer.getvalue()
+    return optimized if len(optimized) < len(content) else None
+
+
+def _smaller(encoded, original):
+    return encoded if len(encoded) < len(original) * (1 - MIN_SAVING) else None
+
+
+def siblings(name, content):
+    '''
+        precompressed or re-encoded variants of a static file by sibling suffix
+    '''
+    extension = posixpath.splitext(name)[1].lower()
+    variants = {}
+    if extension in COMPRESSIBLE:
+        variants['.gz'] = _smaller(gzip.compress(content, 9, mtime=0), content)
+        if brotli is not None:
+            variants['.br'] = _smaller(brotli.compress(content, quality=11), content)
+    elif extension in IMAGES and WEBP_FORMAT in derivative_formats():
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(content)).save(buffer, 'WEBP', quality=80, method=6)
+        variants['.webp'] = _smaller(buffer.getvalue(), content)
+    return {suffix: data for suffix, data in variants.items() if data is not None}
+
+
+class PipelineStorage(ManifestStaticFilesStorage):
+    '''
+        collectstatic storage that, for files under ``pipeline_prefixes``, inlines the
+        @imports of every stylesheet, minifies it and re-encodes images before the
+        manifest fingerprints them; afterwards every collected file gets .gz/.br and
+        .webp siblings where they are smaller, for StaticFilesApp to negotiate
+    '''
+    pipeline_prefixes = ('bulletinboard/',)
+
+    def url(self, name, force=False):
+        # without a manifest collectstatic has not run, e.g. in tests
+        if not self.hashed_files:
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
+
+    def _read(self, paths, name):
+        if name not in paths:
+            return None
+        storage, path = paths[name]
+        with storage.open(path) as source:
+            return source.read()
+
+    def optimize(self, paths, name):
+        extension = posixpath.splitext(name)[1].lower()
+        if extension == '.css':
+            def read(css_name):
+                content = self._read(paths, css_name)
+                return None if content is None else content.decode('utf-8')
+            return minify_css(bundle_css(name, read)).encode('utf-8')
+        if extension in IMAGES:
+            return optimize_image(self._read(paths, name), extension)
+        return None
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        paths = paths.copy()
+        for name in list(paths):
+            if name.startswith(self.pipeline_prefixes):
+                content = self.optimize(paths, name)
+                if content is not None:
+                    # the hashing below reads the optimized copy instead of the app's file
+                    self._replace(name, content)
+                    paths[name] = (self, name)
+        names = set(paths)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.add(hashed_name)
+            yield name, hashed_name, processed
+        for name in names:
+            with self.open(name) as stored:
+                content = stored.read()
+            for suffix, data in siblings(name, content).items():
+                self._replace(name + suffix, data)
+
+
+def _accepts(header, token):
+    for part in header.split(','):
+        value, _, params = part.strip().partition(';')
+        if value.strip().lower() == token:
+            quality = params.strip()
+            return not re.match(r'q\s*=\s*0(\.0*)?$', quality)
+    return False
+
+
+class StaticFilesApp:
+    '''
+        WSGI layer answering requests under ``prefix`` from the collected files in ``root``
+        before Django sees them.
+
+        Fingerprinted names listed in the manifest are cached for a year as immutable,
+        other names are revalidated after a minute. A .br or .gz sibling is sent to
+        clients accepting that encoding and a .webp sibling to clients accepting WebP.
+        Paths without a collected file go on to ``application``.
+    '''
+    block_size = 64 * 1024
+
+    def __init__(self, application, root, prefix, manifest_name='staticfiles.json'):
+        self.application = application
+        self.prefix = prefix
+        self.files = {}
+        if root and os.path.isdir(root):
+            self.files = self.scan(root, manifest_name)
+
+    def scan(self, root, manifest_name):
+        immutable = set()
+        try:
+            with open(os.path.join(root, manifest_name)) as manifest:
+                immutable = set(json.load(manifest).get('paths', {}).values())
+        except (OSError, ValueError):
+            pass
+        found = {}
+        for directory, _, names in os.walk(root):
+            for filename in names:
+                path = os.path.join(directory, filename)
+                found[os.path.relpath(path, root).replace(os.sep, '/')] = path
+        files = {}
+        for name, path in found.items():
+            if name == manifest_name or (posixpath.splitext(name)[1] in ('.gz', '.br', '.webp')
+                                         and posixpath.splitext(name)[0] in found):
+                continue
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+                content_type += '; charset=utf-8'
+            variants = {suffix: self.stat(found[name + suffix])
+                        for suffix in ('.br', '.gz', '.webp') if name + suffix in found}
+            files[name] = {
+                'content_type': content_type,
+                'cache_control': IMMUTABLE if name in immutable else REVALIDATE,
+                'plain': self.stat(path),
+                'variants': variants,
+            }
+        return files
+
+    @staticmethod
+    def stat(path):
+        stat = os.stat(path)
+        return path, stat.st_size, '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+    def negotiate(self, entry, environ):
+        variants = entry['variants']
+        headers = []
+        if '.br' in variants or '.gz' in variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+            accept_encoding = environ.get('HTTP_ACCEPT_ENCODING', '')
+            for suffix, encoding in (('.br', 'br'), ('.gz', 'gzip')):
+                if suffix in variants and _accepts(accept_encoding, encoding):
+                    return variants[suffix], headers + [('Content-Encoding', encoding)], entry['content_type']
+        if '.webp' in variants:
+            headers.append(('Vary', 'Accept'))
+            if 'image/webp' in environ.get('HTTP_ACCEPT', ''):
+                return variants['.webp'], headers, 'image/webp'
+        return entry['plain'], headers, entry['content_type']
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        entry = self.files.get(path[len(self.prefix):]) if path.startswith(self.prefix) else None
+        if entry is None:
+            return self.application(environ, start_response)
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD'), ('Content-Length', '0')])
+            return []
+        (filename, size, etag), headers, content_type = self.negotiate(entry, environ)
+        headers += [('Cache-Control', entry['cache_control']), ('ETag', etag)]
+        if etag in [tag.strip() for tag in environ.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            start_response('304 Not Modified', headers)
+            return []
+        start_response('200 OK', headers + [('Content-Type', content_type), ('Content-Length', str(size))])
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file = open(filename, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(file, self.block_size)
+        return self.iterate(file)
+
+    def iterate(self, file):
+        with file:
+            for block in iter(lambda: file.read(self.block_size), b''):
+                yield block
@@ -0,0 +1,86 @@
+import uuid
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db.models.functions import Lower
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+USER_PREFIX = 'auth:session-user:'
+GENERATION_PREFIX = 'auth:user-generation:'
+
+
+def forget_user(user_id):
+    '''
+        drop the cached copies of a user in every session, e.g. after a save or a password change
+    '''
+    cache.set(GENERATION_PREFIX + str(user_id), uuid.uuid4().hex, None)
+
+
+def forget_session(session_key):
+    if session_key:
+        cache.delete(USER_PREFIX + session_key)
+
+
+def get_cached_user(request):
+    '''
+        django.contrib.auth.get_user, keeping the resolved user in the cache per session.
+
+        A cached user is valid while the user's generation token is unchanged and the
+        session hash still matches its password; both come with one cache round-trip.
+    '''
+    session = request.session
+    try:
+        user_id = get_user_model()._meta.pk.to_python(session[SESSION_KEY])
+    except KeyError:
+        return auth.get_user(request)
+    user_key, generation_key = USER_PREFIX + session.session_key, GENERATION_PREFIX + str(user_id)
+    cached = cache.get_many([user_key, generation_key])
+    entry, generation = cached.get(user_key), cached.get(generation_key)
+    if entry is not None and generation is not None and entry[0] == generation:
+        user, backend = entry[1], entry[2]
+        if (user.pk == user_id and backend == session.get(BACKEND_SESSION_KEY)
+                and backend in settings.AUTHENTICATION_BACKENDS
+                and constant_time_compare(session.get(HASH_SESSION_KEY) or '', user.get_session_auth_hash())):
+            return user
+    if generation is None:
+        # taken before reading the user, so a save in between makes the entry stale
+        cache.add(generation_key, uuid.uuid4().hex, None)
+        generation = cache.get(generation_key)
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(user_key, (generation, user, session.get(BACKEND_SESSION_KEY)), session.get_expiry_age())
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    '''
+        AuthenticationMiddleware resolving request.user through get_cached_user
+    '''
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+class EmailBackend(ModelBackend):
+    '''
+        log in with the email address instead of the username, matched case-insensitively
+        through the lower(email) index; addresses shared by several users never log in
+    '''
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if not username or '@' not in username or password is None:
+            return None
+        users = list(get_user_model()._default_manager.annotate(email_lower=Lower('email'))
+                     .filter(email_lower=username.lower()).order_by('pk')[:2])
+        if len(users) != 1:
+            # spend the time of a hash like ModelBackend does for unknown users
+            get_user_model()().set_password(password)
+            return None
+        user = users[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,260 @@
+import io
+import math
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.db.models import Count
+from django.template.loader import get_template
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Category, Post
+from .sqlite import apply_pragmas
+
+# dataset presets for seed_board
+SIZES = {
+    'small': {'users': 20, 'posts': 200, 'comments': 500},
+    'medium': {'users': 200, 'posts': 5000, 'comments': 20000},
+    'large': {'users': 1000, 'posts': 50000, 'comments': 200000},
+}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[rank]
+
+
+@contextmanager
+def seeded_database(size, seed=1):
+    '''
+        fresh test database filled by seed_board with the ``size`` preset
+    '''
+    old_name = connection.settings_dict['NAME']
+    media_root = tempfile.mkdtemp()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            call_command('seed_board', seed=seed, stdout=io.StringIO(), **SIZES[size])
+            cache.clear()
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def routes():
+    '''
+        (name, path, authenticated) for every page of bulletinboard/urls.py worth timing,
+        pointed at the heaviest rows of the seeded data
+    '''
+    popular = Post.objects.order_by('-comment_count').first()
+    largest = Category.objects.order_by('-post_count').first()
+    seller = User.objects.annotate(posts=Count('post')).order_by('-posts').first()
+    word = popular.announcement_title.split()[0] if popular else 'продаю'
+    return [
+        ('home', reverse('bulletinboard:home'), False),
+        ('categories', reverse('bulletinboard:categories'), False),
+        ('announcements', reverse('bulletinboard:announcements'), True),
+        ('announcement_detail', reverse('bulletinboard:announcement_detail', args=(popular.pk,)), False),
+        ('comments', reverse('bulletinboard:comments', args=(popular.pk,)), False),
+        ('announcements_categories', reverse('bulletinboard:announcements_categories', args=(largest.pk,)), False),
+        ('search', reverse('bulletinboard:search') + '?' + urlencode({'q': word}), False),
+        ('create_announcement', reverse('bulletinboard:create_announcement'), True),
+        ('profile', reverse('bulletinboard:profile', args=(seller.pk,)), False),
+        ('login', reverse('bulletinboard:login'), False),
+        ('signup', reverse('bulletinboard:signup'), False),
+    ]
+
+
+class WSGIDriver:
+    '''
+        calls the project WSGI application directly, without a server or the test client
+    '''
+    def __init__(self, user=None):
+        self.application = get_wsgi_application()
+        self.cookie = ''
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            self.cookie = '{}={}'.format(settings.SESSION_COOKIE_NAME, session)
+
+    def get(self, path, authenticated=False):
+        path, _, query = path.partition('?')
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'REQUEST_METHOD': 'GET',
+                   'SERVER_NAME': '127.0.0.1', 'HTTP_HOST': '127.0.0.1'}
+        if authenticated and self.cookie:
+            environ['HTTP_COOKIE'] = self.cookie
+        setup_testing_defaults(environ)
+        status = []
+        body = self.application(environ, lambda code, headers, exc_info=None: status.append(code))
+        try:
+            size = sum(len(chunk) for chunk in body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return int(status[0].split()[0]), size
+
+
+def measure(driver, path, authenticated, requests, warmup=2, warm_cache=False):
+    for _ in range(warmup):
+        driver.get(path, authenticated)
+    timings, queries = [], []
+    status = size = None
+    for _ in range(requests):
+        if not warm_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            status, size = driver.get(path, authenticated)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    return {
+        'status': status,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': max(queries),
+        'bytes': size,
+    }
+
+
+def run_routes(requests, warm_cache=False):
+    user = User.objects.order_by('id').first()
+    driver = WSGIDriver(user)
+    return {name: measure(driver, path, authenticated, requests, warm_cache=warm_cache)
+            for name, path, authenticated in routes()}
+
+
+def compare(baseline, current, threshold, metric='p95_ms'):
+    '''
+        routes whose ``metric`` grew more than ``threshold`` percent, or whose query count grew
+    '''
+    regressions = []
+    for size, results in current.items():
+        for route, result in results.items():
+            before = baseline.get(size, {}).get(route)
+            if not before:
+                continue
+            change = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+            if change > threshold:
+                regressions.append((size, route, '{} {:.2f} -> {:.2f} ({:+.1f}%)'.format(
+                    metric, before[metric], result[metric], change)))
+            if result['queries'] > before['queries']:
+                regressions.append((size, route, 'queries {} -> {}'.format(before['queries'], result['queries'])))
+    return regressions
+
+
+def render_listing(posts, rounds, warm):
+    '''
+        render time of a category listing of ``posts``; unless ``warm``, the cache is
+        cleared before every round so each card is rendered from scratch
+    '''
+    template = get_template('bulletinboard/announcement_category.html')
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    context = {'announcement_categories': posts, 'page': None}
+    template.render(context, request)
+    timings = []
+    for _ in range(rounds):
+        if not warm:
+            cache.clear()
+        started = time.perf_counter()
+        template.render(context, request)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+    }
+
+
+def _stress_database(path, posts):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.executescript('''
+        CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, comment_count INTEGER NOT NULL DEFAULT 0);
+        CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, text TEXT, created REAL);
+        CREATE INDEX comment_post ON comment (post_id, created DESC, id DESC);
+    ''')
+    connection.executemany('INSERT INTO post (id, title) VALUES (?, ?)',
+                           [(pk, 'post {}'.format(pk)) for pk in range(1, posts + 1)])
+    connection.close()
+
+
+def sqlite_stress(pragmas, readers=8, writers=4, seconds=5.0, timeout=1.0, posts=2000):
+    '''
+        threads reading a post with its newest comments against threads adding comments
+        and bumping the counter, like the comment views do, on a scratch database file.
+
+        Every connection waits at most ``timeout`` seconds for a lock (``pragmas`` may
+        override it with busy_timeout); lock errors are counted, not retried.
+    '''
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'stress.sqlite3')
+    _stress_database(path, posts)
+    deadline = time.monotonic() + seconds
+    totals = {'reads': 0, 'writes': 0, 'errors': 0, 'write_ms': []}
+    lock = threading.Lock()
+
+    def work(write):
+        connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        rng = random.Random()
+        done = errors = 0
+        timings = []
+        while time.monotonic() < deadline:
+            post_id = rng.randint(1, posts)
+            started = time.perf_counter()
+            try:
+                if write:
+                    connection.execute('BEGIN')
+                    connection.execute('INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+                                       (post_id, 'x' * 200, time.time()))
+                    connection.execute('UPDATE post SET comment_count = comment_count + 1 WHERE id = ?', (post_id,))
+                    connection.execute('COMMIT')
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    connection.execute('SELECT * FROM post WHERE id = ?', (post_id,)).fetchall()
+                    connection.execute('SELECT * FROM comment WHERE post_id = ? ORDER BY created DESC, id DESC '
+                                       'LIMIT 20', (post_id,)).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+        connection.close()
+        with lock:
+            totals['writes' if write else 'reads'] += done
+            totals['errors'] += errors
+            totals['write_ms'] += timings
+
+    threads = [threading.Thread(target=work, args=(index < writers,)) for index in range(readers + writers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    timings = totals.pop('write_ms')
+    totals['reads_per_s'] = round(totals['reads'] / seconds, 1)
+    totals['writes_per_s'] = round(totals['writes'] / seconds, 1)
+    totals['write_p95_ms'] = round(percentile(timings, 95), 3) if timings else None
+    return totals
@@ -0,0 +1,170 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+from django.views.decorators.http import condition
+
+TAG_PREFIX = 'pagecache:tag:'
+PAGE_PREFIX = 'pagecache:page:'
+VALIDATORS_PREFIX = 'pagecache:validators:'
+DATA_PREFIX = 'pagecache:data:'
+HITS_KEY = 'pagecache:hits'
+MISSES_KEY = 'pagecache:misses'
+
+
+def _tag_versions(tags):
+    '''
+        current version token of every tag; a tag unknown to the cache gets a fresh token,
+        so pages stored under an evicted version can never be served again
+    '''
+    keys = [TAG_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags):
+    cache.set_many({TAG_PREFIX + tag: uuid.uuid4().hex for tag in tags}, None)
+
+
+def cached_by_tags(name, tags, compute, timeout=None):
+    '''
+        ``compute()`` kept in the cache until one of ``tags`` is invalidated
+    '''
+    raw = '|'.join([name] + _tag_versions(tags))
+    key = DATA_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+    cached = cache.get(key)
+    if cached is None:
+        cached = (compute(),)
+        cache.set(key, cached, timeout if timeout is not None else getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+    return cached[0]
+
+
+def page_cache_key(request, tags):
+    raw = '|'.join([request.build_absolute_uri(), get_language() or ''] + _tag_versions(tags))
+    return PAGE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def page_cache_stats():
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses) if hits + misses else 0.0}
+
+
+def reset_page_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _store_timeout(request, timeout):
+    # a replica may not have the write that bumped a tag yet, so what was read from it
+    # is kept only as long as writers stay pinned to the primary
+    if getattr(request, 'read_replica', None):
+        return min(timeout, getattr(settings, 'REPLICA_STICKY_SECONDS', 15))
+    return timeout
+
+
+def anonymous_page_cache(*tags, timeout=None):
+    '''
+        serve GET requests of anonymous users from the cache.
+
+        ``tags`` name what the page is built from and may use the view kwargs, e.g.
+        'category:{category_id}'; invalidate_tags() expires every page carrying a tag.
+        Authenticated users and responses setting cookies always bypass the cache.
+    '''
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+            key = page_cache_key(request, [tag.format(**kwargs) for tag in tags])
+            response = cache.get(key)
+            if response is not None:
+                _count(HITS_KEY)
+                return response
+            _count(MISSES_KEY)
+            response = view_func(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if response.status_code != 200 or response.streaming:
+                return response
+            store_timeout = _store_timeout(
+                request, timeout if timeout is not None else getattr(settings, 'PAGE_CACHE_TIMEOUT', 600))
+
+            def store(rendered):
+                # a page carrying a csrf token or any cookie is specific to this visitor
+                if not rendered.cookies and not request.META.get('CSRF_COOKIE_USED'):
+                    cache.set(key, rendered, store_timeout)
+
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(validators, *tags):
+    '''
+        answer If-None-Match with 304 before the view runs.
+
+        ``validators(**view_kwargs)`` returns the values what the page shows depends on,
+        or None when there is nothing to show. The ETag also covers the versions of
+        ``tags`` and the user, because pages render per-user parts and counters. No
+        Last-Modified is sent: edits, comments and counters do not move any one date
+        forward, so a client revalidating by date alone would keep a stale copy. Every
+        write that changes a tagged page bumps a tag, so its validators are computed
+        once per tag version and kept in the cache.
+    '''
+    def state(request, kwargs):
+        if hasattr(request, '_page_validators'):
+            return request._page_validators
+        versions = _tag_versions([tag.format(**kwargs) for tag in tags])
+        if versions:
+            raw = '|'.join([request.resolver_match.view_name if request.resolver_match else request.path,
+                            repr(sorted(kwargs.items()))] + versions)
+            key = VALIDATORS_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+            cached = cache.get(key)
+            if cached is None:
+                cached = (validators(**kwargs),)
+                cache.set(key, cached, _store_timeout(request, getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)))
+            values = cached[0]
+        else:
+            values = validators(**kwargs)
+        request._page_validators = values, versions
+        return request._page_validators
+
+    def etag(request, *args, **kwargs):
+        values, versions = state(request, kwargs)
+        if values is None:
+            return None
+        raw = '|'.join([str(value) for value in values] + versions
+                       + [str(request.user.pk or ''), get_language() or ''])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
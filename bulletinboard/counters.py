@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, Comment, Post
+
+
+def _counted(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total'), output_field=IntegerField()), Value(0))
+
+
+def increment(model, pk, field, delta):
+    '''
+        atomic ``field = field + delta``; never drops below zero so drift cannot violate the column check
+    '''
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{field + '__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _repair(model, field, actual, batch_size):
+    repaired = 0
+    bounds = model.objects.order_by('pk').values_list('pk', flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return repaired
+    for start in range(first, last + 1, batch_size):
+        with transaction.atomic():
+            repaired += (model.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                         .exclude(**{field: actual}).update(**{field: actual}))
+    return repaired
+
+
+def repair_post_counts(batch_size=10000):
+    return _repair(Category, 'post_count', _counted(Post.objects.all(), 'category'), batch_size)
+
+
+def repair_comment_counts(batch_size=10000):
+    return _repair(Post, 'comment_count', _counted(Comment.objects.all(), 'in_post'), batch_size)
@@ -1,2 +1,8 @@
 class PermissionDenied(Exception):
-    status_code = 403
\ No newline at end of file
+    status_code = 403
+
+
+class InvalidCursor(Exception):
+    '''
+        a page cursor KeysetPaginator did not produce; listing views answer it with 404
+    '''
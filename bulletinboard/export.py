@@ -0,0 +1,91 @@
+import csv
+import datetime
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+# columns of every export, read with values() so no model instances are built
+EXPORTS = {
+    'posts': (Post, 'published_date', 'category_id', (
+        'id', 'external_id', 'author__username', 'category_id', 'category__category_name', 'announcement_title',
+        'description', 'price', 'published_date', 'comment_count', 'announcement_image')),
+    'comments': (Comment, 'date_publish', 'in_post__category_id', (
+        'id', 'in_post_id', 'author__username', 'text', 'date_publish')),
+}
+
+
+def export_rows(kind, category_id=None, since=None, until=None, chunk_size=CHUNK_SIZE):
+    '''
+        rows of ``kind`` in id order; ``since`` and ``until`` are inclusive dates
+    '''
+    model, date_field, category_field, fields = EXPORTS[kind]
+    queryset = model.objects.all()
+    if category_id is not None:
+        queryset = queryset.filter(**{category_field: category_id})
+    if since is not None:
+        queryset = queryset.filter(**{date_field + '__gte': _start_of(since)})
+    if until is not None:
+        queryset = queryset.filter(**{date_field + '__lt': _start_of(until + datetime.timedelta(days=1))})
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+class _Line:
+    def write(self, value):
+        return value
+
+
+def csv_lines(kind, rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORTS[kind][3])
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime.datetime) else value
+                               for value in row])
+
+
+def jsonl_lines(kind, rows):
+    fields = EXPORTS[kind][3]
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def encoded(lines, buffer_size=BUFFER_SIZE):
+    '''
+        utf-8 chunks of about ``buffer_size`` bytes, so the response is not written line by line
+    '''
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks, level=6):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, fmt='csv', compress=False, **filters):
+    lines = csv_lines if fmt == 'csv' else jsonl_lines
+    chunks = encoded(lines(kind, export_rows(kind, **filters)))
+    return gzipped(chunks) if compress else chunks
@@ -0,0 +1,147 @@
+import logging
+import threading
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.utils import timezone
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'home-feed:version'
+
+# what _post_card.html shows; the image stays a FieldFile so responsive_image can render it
+Card = namedtuple('Card', ('id', 'announcement_title', 'price', 'published_date', 'updated_at',
+                           'comment_count', 'announcement_image'))
+
+
+def _image(name):
+    field = Post._meta.get_field('announcement_image')
+    return field.attr_class(None, field, name)
+
+
+def _card(post, comment_count=None):
+    return Card(post.pk, post.announcement_title, post.price, post.published_date, post.updated_at,
+                post.comment_count if comment_count is None else comment_count,
+                _image(post.announcement_image.name))
+
+
+def _fresh_version():
+    # a random start never matches a copy taken before the key was evicted
+    return uuid.uuid4().int >> 72
+
+
+def _bump():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _fresh_version(), None)
+        return cache.incr(VERSION_KEY)
+
+
+class LatestPosts:
+    '''
+        the newest published posts as card data, kept in process memory.
+
+        Every write bumps VERSION_KEY in the cache, and a process holding an older copy
+        reloads it with one query on its next read. The process that wrote applies the
+        change to its own copy when the transaction commits.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.cards = None
+        self.version = None
+
+    def current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, _fresh_version(), None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def load(self):
+        # taken before the query, so a write landing during it makes the copy stale again
+        version = self.current_version()
+        # from the primary: a copy read from a lagging replica would be kept until the next write
+        posts = (Post.objects.using(DEFAULT_DB_ALIAS).publish().order_by('-published_date', '-id')
+                 .only(*Card._fields)[:self.size])
+        cards = tuple(_card(post) for post in posts)
+        with self.lock:
+            self.cards, self.version = cards, version
+        return cards
+
+    def latest(self):
+        version = self.current_version()
+        with self.lock:
+            if self.cards is not None and self.version == version:
+                return self.cards
+        return self.load()
+
+    def changed(self, update=None):
+        '''
+            tell every process the feed is stale; ``update(cards)`` returns this process's
+            cards with the change applied, or None when only the database can fill them
+        '''
+        first = _bump()
+
+        def apply():
+            # bumped again after the commit, for processes that reloaded before it
+            second = _bump()
+            if update is None:
+                return
+            with self.lock:
+                # anything but our own two bumps means another write we have not seen
+                if self.cards is None or second != first + 1 or self.version not in (first - 1, first):
+                    return
+                cards = update(self.cards)
+                if cards is not None:
+                    self.cards, self.version = cards, second
+
+        transaction.on_commit(apply)
+
+    def saved(self, post):
+        def update(cards):
+            previous = next((card for card in cards if card.id == post.pk), None)
+            kept = [card for card in cards if card.id != post.pk]
+            if post.published_date is not None and post.published_date <= timezone.now():
+                # counters are kept up to date by comment signals, an edited instance may be older
+                kept.append(_card(post, previous.comment_count if previous else None))
+                kept.sort(key=lambda card: (card.published_date, card.id), reverse=True)
+            kept = tuple(kept[:self.size])
+            if previous is not None and len(cards) == self.size and post.pk not in {card.id for card in kept}:
+                return None
+            return kept
+        self.changed(update)
+
+    def deleted(self, post):
+        def update(cards):
+            kept = tuple(card for card in cards if card.id != post.pk)
+            if len(kept) < len(cards) and len(cards) == self.size:
+                return None
+            return kept
+        self.changed(update)
+
+    def commented(self, post_id, delta):
+        def update(cards):
+            return tuple(card._replace(comment_count=max(card.comment_count + delta, 0)) if card.id == post_id
+                         else card for card in cards)
+        self.changed(update)
+
+
+home_feed = LatestPosts(getattr(settings, 'HOME_FEED_SIZE', 8))
+
+
+def warm_home_feed():
+    '''
+        load the feed before the first request; a database that is not ready yet is left
+        to the first request to try again
+    '''
+    try:
+        home_feed.load()
+    except DatabaseError:
+        logger.warning('Could not warm the home feed', exc_info=True)
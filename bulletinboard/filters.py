@@ -0,0 +1,90 @@
+import datetime
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .cache import cached_by_tags
+from .models import Category, Post
+
+# cursor orderings, each backed by an index with and without a category
+SORTS = {
+    'new': ('-published_date', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+}
+
+# lower bounds of the price facet, every bucket runs up to the next bound
+PRICE_BUCKETS = (0, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def category_choices():
+    # a handful of rows, sorted here rather than by a temporary b-tree
+    return cached_by_tags('filter:categories', ['categories'], lambda: sorted(
+        Category.objects.values_list('id', 'category_name'), key=lambda choice: choice[1]))
+
+
+def _since(filters):
+    since = filters.get('since')
+    if since is None:
+        return Q()
+    start = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min))
+    return Q(published_date__gte=start)
+
+
+def _price(filters):
+    condition = Q()
+    if filters.get('min_price') is not None:
+        condition &= Q(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        condition &= Q(price__lt=filters['max_price'])
+    return condition
+
+
+def _bucket(index):
+    condition = Q(price__gte=PRICE_BUCKETS[index])
+    if index + 1 < len(PRICE_BUCKETS):
+        condition &= Q(price__lt=PRICE_BUCKETS[index + 1])
+    return condition
+
+
+def filter_posts(filters):
+    '''
+        published posts matching the cleaned FilterForm data
+    '''
+    queryset = Post.objects.publish().filter(_since(filters) & _price(filters))
+    if filters.get('category'):
+        queryset = queryset.filter(category_id=filters['category'])
+    return queryset
+
+
+def _count(condition):
+    return Count('id', filter=condition) if condition else Count('id')
+
+
+def _facet_counts(filters):
+    price = _price(filters)
+    rows = (Post.objects.publish().filter(_since(filters)).order_by().values('category_id')
+            .annotate(matching=_count(price),
+                      **{'bucket{}'.format(index): _count(_bucket(index)) for index in range(len(PRICE_BUCKETS))}))
+    category = filters.get('category')
+    categories = {row['category_id']: row['matching'] for row in rows}
+    buckets = [sum(row['bucket{}'.format(index)] for row in rows if not category or row['category_id'] == category)
+               for index in range(len(PRICE_BUCKETS))]
+    return {
+        'total': categories.get(category, 0) if category else sum(categories.values()),
+        'categories': categories,
+        'prices': [(low, PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None, count)
+                   for index, (low, count) in enumerate(zip(PRICE_BUCKETS, buckets))],
+    }
+
+
+def facet_counts(filters):
+    '''
+        posts per category and per price bucket for the current filter, from one grouped query.
+
+        Each facet ignores its own condition, so the counts say how many posts picking
+        another category or price range would show. Kept until the next post write.
+    '''
+    key = 'filter:facets:{}'.format(sorted((name, str(value)) for name, value in filters.items()
+                                           if name in ('category', 'min_price', 'max_price', 'since')))
+    return cached_by_tags(key, ['categories'], lambda: _facet_counts(filters))
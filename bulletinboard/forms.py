@@ -1,7 +1,9 @@
+import datetime
+
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Post, Profile, Comment
+from .models import Category, Post, Profile, Comment
 
 
 class AnnouncementPostForm(forms.ModelForm):
@@ -35,13 +37,69 @@ class CommentForm(forms.ModelForm):
         }
 
 
-from django.contrib.auth.forms import AuthenticationForm, UsernameField, UserCreationForm
+class ExportForm(forms.Form):
+    kind = forms.ChoiceField(choices=[('posts', 'posts'), ('comments', 'comments')], initial='posts', required=False)
+    format = forms.ChoiceField(choices=[('csv', 'csv'), ('jsonl', 'jsonl')], initial='csv', required=False)
+    category = forms.ModelChoiceField(queryset=Category.objects.all(), required=False)
+    since = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+    until = forms.DateField(required=False, input_formats=['%Y-%m-%d'])
+    gzip = forms.BooleanField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since, until = cleaned_data.get('since'), cleaned_data.get('until')
+        if since and until and since > until:
+            raise ValidationError('since must not be after until')
+        cleaned_data['kind'] = cleaned_data.get('kind') or 'posts'
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        return cleaned_data
+
+
+class FilterForm(forms.Form):
+    category = forms.TypedChoiceField(coerce=int, empty_value=None, required=False, label='Категория')
+    min_price = forms.FloatField(min_value=0, required=False, label='Цена от',
+                                 widget=forms.NumberInput(attrs={'class': 'create-form-input', 'placeholder': 'Цена от'}))
+    max_price = forms.FloatField(min_value=0, required=False, label='Цена до',
+                                 widget=forms.NumberInput(attrs={'class': 'create-form-input', 'placeholder': 'Цена до'}))
+    since = forms.DateField(required=False, input_formats=['%Y-%m-%d'], label='Размещены с',
+                            widget=forms.DateInput(attrs={'class': 'create-form-input', 'type': 'date'}))
+    sort = forms.ChoiceField(choices=[('new', 'Сначала новые'), ('price', 'Сначала дешевые'),
+                                      ('-price', 'Сначала дорогие')], required=False, label='Сортировка')
+
+    def __init__(self, *args, categories=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'].choices = [('', 'Все категории')] + list(categories)
+        for name in ('category', 'sort'):
+            self.fields[name].widget.attrs['class'] = 'create-form-input'
+
+    def clean_since(self):
+        since = self.cleaned_data.get('since')
+        # the start of such a day in local time is out of datetime's range once made UTC
+        if since is not None and since < datetime.date(2000, 1, 1):
+            raise ValidationError('Дата должна быть не раньше 01.01.2000')
+        return since
+
+    def clean(self):
+        cleaned_data = super().clean()
+        low, high = cleaned_data.get('min_price'), cleaned_data.get('max_price')
+        if low is not None and high is not None and low >= high:
+            raise ValidationError('Минимальная цена должна быть меньше максимальной')
+        cleaned_data['sort'] = cleaned_data.get('sort') or 'new'
+        return cleaned_data
+
+
+from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm, UsernameField, UserCreationForm
 from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from django.template import loader
+
+from .jobs import enqueue
+from .tasks import send_email
 
 
 class LoginForm(AuthenticationForm):
 
-     username = UsernameField(widget=forms.TextInput(attrs={'autofocus': True, 'placeholder': 'Логин',
+     username = UsernameField(widget=forms.TextInput(attrs={'autofocus': True, 'placeholder': 'Логин или email',
                                                             'class': 'login-form-input'}))
 
      password = forms.CharField(
@@ -55,6 +113,20 @@ class LoginForm(AuthenticationForm):
      }
 
 
+class QueuedPasswordResetForm(PasswordResetForm):
+    '''
+        renders the reset email in the request and leaves sending it to run_worker
+    '''
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = ''.join(loader.render_to_string(subject_template_name, context).splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html = None
+        if html_email_template_name is not None:
+            html = loader.render_to_string(html_email_template_name, context)
+        enqueue(send_email, subject=subject, body=body, from_email=from_email, to=[to_email], html=html)
+
+
 class SignupForm(UserCreationForm):
      error_messages = {
          'password_mismatch': "Пароли не совпадают.",
@@ -83,8 +155,8 @@ class SignupForm(UserCreationForm):
 
      def clean_email(self):
          email = self.cleaned_data.get('email')
-         username = self.cleaned_data.get('username')
-         if email and User.objects.filter(email=email).exclude(username=username).exists():
+         # compared as lower(email), which auth_user_email_lower_idx covers
+         if email and User.objects.annotate(email_lower=Lower('email')).filter(email_lower=email.lower()).exists():
              raise forms.ValidationError('Email addresses must be unique.')
          return email
 
@@ -0,0 +1,120 @@
+import io
+import json
+import posixpath
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+DERIVATIVES_DIR = 'derivatives'
+FALLBACK_FORMAT = ('JPEG', 'jpg', 'image/jpeg')
+WEBP_FORMAT = ('WEBP', 'webp', 'image/webp')
+MANIFEST_CACHE_TIMEOUT = 60 * 60
+# until the worker has written it; another web process would not see the cached miss go away
+MISSING_MANIFEST_CACHE_TIMEOUT = 5
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 1280)))
+
+
+def derivative_formats():
+    if features.check('webp'):
+        return (WEBP_FORMAT, FALLBACK_FORMAT)
+    return (FALLBACK_FORMAT,)
+
+
+def _base(name):
+    stem, _ = posixpath.splitext(name)
+    return posixpath.join(DERIVATIVES_DIR, stem)
+
+
+def manifest_name(name):
+    return _base(name) + '.json'
+
+
+def derivative_name(name, width, extension):
+    return '{}_{}w.{}'.format(_base(name), width, extension)
+
+
+def _encode(image, pil_format):
+    buffer = io.BytesIO()
+    if pil_format == 'JPEG':
+        if image.mode != 'RGB':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+            image = background
+        image.save(buffer, 'JPEG', quality=80, optimize=True, progressive=True)
+    else:
+        image.save(buffer, pil_format, quality=80, method=4)
+    return buffer.getvalue()
+
+
+def _replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def generate_derivatives(name, storage=None, force=False):
+    '''
+        write downscaled copies of an uploaded image next to a small json manifest.
+
+        Widths wider than the original are skipped, the original width is always kept
+        as the largest candidate. Returns the manifest.
+    '''
+    storage = storage or default_storage
+    if not force and storage.exists(manifest_name(name)):
+        return load_manifest(name, storage)
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    original_width = original.size[0]
+    widths = sorted({width for width in derivative_widths() if width < original_width} | {original_width})
+    manifest = {'widths': widths, 'formats': {}}
+    for pil_format, extension, mime in derivative_formats():
+        candidates = []
+        for width in widths:
+            image = original
+            if width < original_width:
+                image = original.copy()
+                image.thumbnail((width, original.size[1]), Image.LANCZOS)
+            candidates.append([_replace(storage, derivative_name(name, width, extension), _encode(image, pil_format)),
+                               width])
+        manifest['formats'][mime] = candidates
+    _replace(storage, manifest_name(name), json.dumps(manifest).encode())
+    cache.set(_cache_key(name), manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def _cache_key(name):
+    return 'derivatives:' + name
+
+
+def load_manifest(name, storage=None):
+    '''
+        derivative manifest of an image or None when it has not been generated yet
+    '''
+    storage = storage or default_storage
+    manifest = cache.get(_cache_key(name))
+    if manifest is None:
+        try:
+            with storage.open(manifest_name(name), 'rb') as stored:
+                manifest = json.loads(stored.read().decode())
+        except (OSError, ValueError):
+            manifest = {}
+        cache.set(_cache_key(name), manifest, MANIFEST_CACHE_TIMEOUT if manifest else MISSING_MANIFEST_CACHE_TIMEOUT)
+    return manifest or None
+
+
+def delete_derivatives(name, storage=None):
+    storage = storage or default_storage
+    manifest = load_manifest(name, storage) or {}
+    for candidates in manifest.get('formats', {}).values():
+        for derivative, _ in candidates:
+            storage.delete(derivative)
+    storage.delete(manifest_name(name))
+    cache.delete(_cache_key(name))
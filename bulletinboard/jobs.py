@@ -0,0 +1,132 @@
+import datetime
+import json
+import logging
+import random
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(func=None, name=None):
+    '''
+        register a function that run_worker may execute, by ``name`` or by its dotted path
+    '''
+    def register(func):
+        func.task_name = name or '{}.{}'.format(func.__module__, func.__qualname__)
+        TASKS[func.task_name] = func
+        return func
+    return register(func) if func is not None else register
+
+
+def enqueue(func, delay=0, max_attempts=None, **payload):
+    '''
+        queue ``func(**payload)`` for run_worker; the payload has to be json serializable.
+
+        The row is written in the caller's transaction, so a job never sees data
+        that was rolled back.
+    '''
+    name = func if isinstance(func, str) else func.task_name
+    if name not in TASKS:
+        raise KeyError('Unknown task {}'.format(name))
+    return Job.objects.create(
+        name=name, payload=json.dumps(payload),
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+
+
+def backoff(attempts):
+    '''
+        seconds to wait before retry number ``attempts``: exponential with jitter, capped
+    '''
+    base = getattr(settings, 'JOB_RETRY_DELAY', 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_MAX_RETRY_DELAY', 3600))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(worker, limit):
+    '''
+        move up to ``limit`` due jobs to running and return their ids.
+
+        A single UPDATE picks and locks the rows, so concurrent workers never get the same
+        job; each finds its rows again by a claim token. On SQLite one statement also takes
+        the write lock up front, where a SELECT followed by an UPDATE could fail with
+        "database is locked" instead of waiting.
+    '''
+    token = '{}:{}'.format(worker, uuid.uuid4().hex[:8])
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        claimed = Job.objects.filter(id__in=Subquery(due.values('id')[:limit]), status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=token, locked_at=now, attempts=F('attempts') + 1)
+    if not claimed:
+        return []
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING)
+                .order_by('run_at', 'id').values_list('id', flat=True))
+
+
+def execute(job_id):
+    '''
+        run one claimed job and record the outcome; safe to call in a worker thread or process
+    '''
+    job = Job.objects.get(pk=job_id)
+    try:
+        TASKS[job.name](**json.loads(job.payload))
+    except Exception:
+        fail(job, traceback.format_exc())
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def fail(job, error):
+    if job.attempts >= job.max_attempts:
+        logger.error('Job %s (%s) is dead after %s attempts:\n%s', job.pk, job.name, job.attempts, error)
+        Job.objects.filter(pk=job.pk).update(status=Job.DEAD, finished_at=timezone.now(), last_error=error)
+    else:
+        logger.warning('Job %s (%s) failed, attempt %s of %s', job.pk, job.name, job.attempts, job.max_attempts)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED, last_error=error, locked_by='',
+            run_at=timezone.now() + datetime.timedelta(seconds=backoff(job.attempts)))
+
+
+def requeue_stale(timeout):
+    '''
+        jobs left running by a worker that died are retried, or buried once out of attempts
+    '''
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - datetime.timedelta(seconds=timeout))
+    dead = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.DEAD, finished_at=timezone.now(), last_error='Worker lost while running the job')
+    requeued = stale.update(status=Job.QUEUED, locked_by='', run_at=timezone.now())
+    return requeued, dead
+
+
+def retry(queryset):
+    return queryset.filter(status__in=(Job.DEAD, Job.QUEUED)).update(
+        status=Job.QUEUED, attempts=0, run_at=timezone.now(), finished_at=None, locked_by='')
+
+
+def run_pending(worker='inline', limit=100):
+    '''
+        run due jobs in this thread until none are left, mostly for tests and --once
+    '''
+    done = 0
+    while True:
+        ids = claim(worker, limit)
+        if not ids:
+            return done
+        for job_id in ids:
+            execute(job_id)
+            done += 1
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from bulletinboard.archive import archive_cutoff, archive_posts
+
+
+class Command(BaseCommand):
+    help = 'Move posts older than --weeks, with their comments, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=None,
+                            help='Archive posts published more than this many weeks ago (ARCHIVE_AFTER_WEEKS, 16)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Posts moved per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        moved = archive_posts(older_than=archive_cutoff(options['weeks']), batch_size=options['batch_size'],
+                              pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS('Archived {} posts'.format(moved)))
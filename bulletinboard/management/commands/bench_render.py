@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from bulletinboard.benchmarks import render_listing, seeded_database
+from bulletinboard.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Time rendering of announcement listings with every post card rendered ("cold", as before '
+            'fragment caching) against cards served from the fragment cache ("warm")')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', default='20,50,100', help='Comma separated listing sizes')
+        parser.add_argument('--rounds', type=int, default=50)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['posts'].split(',')]
+        with seeded_database('small'):
+            posts = list(Post.objects.with_related().order_by('-published_date', '-id')[:max(sizes)])
+            self.stdout.write('{:>6}{:>14}{:>14}{:>10}'.format('posts', 'cold p50 ms', 'warm p50 ms', 'speedup'))
+            for size in sizes:
+                cold = render_listing(posts[:size], options['rounds'], warm=False)
+                warm = render_listing(posts[:size], options['rounds'], warm=True)
+                self.stdout.write('{:>6}{:>14.2f}{:>14.2f}{:>9.1f}x'.format(
+                    size, cold['p50_ms'], warm['p50_ms'], cold['p50_ms'] / warm['p50_ms']))
@@ -0,0 +1,54 @@
+import json
+import platform
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bulletinboard.benchmarks import SIZES, compare, run_routes, seeded_database
+
+
+class Command(BaseCommand):
+    help = ('Time every bulletinboard page through the WSGI application against seeded databases '
+            'and optionally compare with a previous run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium', help='Comma separated presets: ' + ', '.join(SIZES))
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per route')
+        parser.add_argument('--output', default='bench_routes.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Allowed p95 slowdown in percent before a route counts as regressed')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the page cache between requests instead of timing full renders')
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = set(sizes) - set(SIZES)
+        if unknown:
+            raise CommandError('Unknown sizes: {}'.format(', '.join(sorted(unknown))))
+        results = {}
+        for size in sizes:
+            self.stdout.write('Seeding {} database...'.format(size))
+            with seeded_database(size):
+                results[size] = run_routes(options['requests'], warm_cache=options['warm_cache'])
+            self.report(size, results[size])
+        with open(options['output'], 'w') as output:
+            json.dump({'meta': {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                                'requests': options['requests'], 'warm_cache': options['warm_cache']},
+                       'results': results}, output, indent=2, ensure_ascii=False)
+        self.stdout.write('Results written to {}'.format(options['output']))
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                regressions = compare(json.load(baseline)['results'], results, options['threshold'])
+            for size, route, message in regressions:
+                self.stdout.write(self.style.ERROR('{} {}: {}'.format(size, route, message)))
+            if regressions:
+                raise CommandError('{} regressions over {}%'.format(len(regressions), options['threshold']))
+            self.stdout.write(self.style.SUCCESS('No regressions over {}%'.format(options['threshold'])))
+
+    def report(self, size, results):
+        self.stdout.write('{:<26}{:>7}{:>10}{:>10}{:>10}{:>9}{:>10}'.format(
+            size, 'status', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'bytes'))
+        for route, result in results.items():
+            self.stdout.write('{:<26}{status:>7}{p50_ms:>10.2f}{p95_ms:>10.2f}{p99_ms:>10.2f}{queries:>9}{bytes:>10}'
+                              .format(route, **result))
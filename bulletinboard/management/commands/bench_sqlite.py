@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from bulletinboard.benchmarks import sqlite_stress
+from bulletinboard.sqlite import PRODUCTION_PRAGMAS
+
+
+class Command(BaseCommand):
+    help = ('Concurrent read/write stress test of stock SQLite settings against the production '
+            'profile (WAL and tuned pragmas), reporting throughput and "database is locked" errors')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--timeout', type=float, default=1.0,
+                            help='Seconds a request may wait for a lock before it fails')
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('stock', {}),
+            ('production', dict(PRODUCTION_PRAGMAS, busy_timeout=int(options['timeout'] * 1000))),
+        ]
+        self.stdout.write('{:<12}{:>12}{:>12}{:>15}{:>14}'.format(
+            'profile', 'reads/s', 'writes/s', 'write p95 ms', 'lock errors'))
+        for name, pragmas in profiles:
+            result = sqlite_stress(pragmas, options['readers'], options['writers'], options['seconds'],
+                                   options['timeout'])
+            self.stdout.write('{:<12}{:>12.0f}{:>12.0f}{:>15}{:>14}'.format(
+                name, result['reads_per_s'], result['writes_per_s'], result['write_p95_ms'], result['errors']))
@@ -0,0 +1,86 @@
+import collections
+import os
+import shutil
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bulletinboard.feed import home_feed
+from bulletinboard.images import DERIVATIVES_DIR, delete_derivatives
+from bulletinboard.models import ArchivedPost, MediaBlob, Post, Profile
+from bulletinboard.storage import content_hash, content_storage
+
+# every column holding a content_storage name, archived posts keep theirs until purged
+IMAGE_FIELDS = (('announcement_image', Post), ('announcement_image', ArchivedPost), ('avatar', Profile))
+
+
+class Command(BaseCommand):
+    help = 'Rename media files to content addressed names, remove duplicate copies and rebuild reference counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default='images', help='Media subdirectory to deduplicate')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would change')
+
+    def legacy_files(self, directory):
+        root = content_storage.location
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, directory)):
+            dirnames[:] = [name for name in dirnames if name != DERIVATIVES_DIR]
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+                if not content_storage.is_content_addressed(name):
+                    yield name
+
+    def move(self, name, target):
+        '''
+            make ``target`` exist before rows point at it, drop ``name`` only afterwards
+        '''
+        source, destination = content_storage.path(name), content_storage.path(target)
+        if os.path.exists(destination):
+            return False
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+        return True
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved = duplicates = reclaimed = 0
+        seen = set()
+        for name in self.legacy_files(options['directory']):
+            with open(content_storage.path(name), 'rb') as handle:
+                target = content_storage.content_name(name, content_hash(File(handle)))
+            if dry_run:
+                unique = target not in seen and not content_storage.exists(target)
+            else:
+                unique = self.move(name, target)
+            seen.add(target)
+            if unique:
+                moved += 1
+            else:
+                duplicates += 1
+                reclaimed += content_storage.size(name)
+            if dry_run:
+                continue
+            with transaction.atomic():
+                for field, model in IMAGE_FIELDS:
+                    model.objects.filter(**{field: name}).update(**{field: target})
+            content_storage.delete(name)
+            delete_derivatives(name)
+        if not dry_run:
+            self.rebuild_refcounts()
+            home_feed.changed()
+        self.stdout.write(self.style.SUCCESS(
+            '{}{} files renamed, {} duplicates removed, {} bytes reclaimed'.format(
+                'Dry run: ' if dry_run else '', moved, duplicates, reclaimed)))
+
+    def rebuild_refcounts(self):
+        counts = collections.Counter()
+        for field, model in IMAGE_FIELDS:
+            counts.update(name for name in model.objects.values_list(field, flat=True).iterator() if name)
+        with transaction.atomic():
+            MediaBlob.objects.all().delete()
+            MediaBlob.objects.bulk_create(
+                [MediaBlob(name=name, refcount=count) for name, count in counts.items()], batch_size=500)
@@ -0,0 +1,38 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bulletinboard.export import EXPORTS, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Stream posts or comments to a csv or jsonl file (or stdout) in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+        parser.add_argument('--output', default='-', help='Target file, - for stdout')
+        parser.add_argument('--category', type=int, help='Only this category id')
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='First day included (YYYY-MM-DD)')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, help='Last day included (YYYY-MM-DD)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        if options['since'] and options['until'] and options['since'] > options['until']:
+            raise CommandError('--since must not be after --until')
+        chunks = export_stream(options['kind'], options['format'], compress=options['gzip'],
+                               category_id=options['category'], since=options['since'], until=options['until'],
+                               chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
+            return
+        written = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                written += output.write(chunk)
+        self.stderr.write('{} bytes written to {}'.format(written, options['output']))
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bulletinboard.images import generate_derivatives
+from bulletinboard.models import ArchivedPost, Post, Profile
+
+
+def _generate(name, force):
+    try:
+        generate_derivatives(name, force=force)
+    except Exception as exc:
+        return name, str(exc)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails and WebP derivatives for announcement images and avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of worker processes, defaults to the number of CPUs')
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that already exist')
+
+    def image_names(self):
+        names = set(Post.objects.exclude(announcement_image='').values_list('announcement_image', flat=True))
+        names.update(ArchivedPost.objects.exclude(announcement_image='').values_list('announcement_image', flat=True))
+        names.update(Profile.objects.exclude(avatar='').values_list('avatar', flat=True))
+        names.discard(None)
+        return sorted(names)
+
+    def handle(self, *args, **options):
+        names = self.image_names()
+        # forked workers must not share the parent's sqlite connection
+        connections.close_all()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(_generate, name, options['force']) for name in names]
+            for done, future in enumerate(as_completed(futures), 1):
+                name, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write('{}: {}'.format(name, error))
+                if done % 100 == 0:
+                    self.stdout.write('{}/{} images processed'.format(done, len(names)))
+        self.stdout.write(self.style.SUCCESS(
+            'Generated derivatives for {} images, {} failed'.format(len(names) - failed, failed)))
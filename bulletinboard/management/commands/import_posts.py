@@ -0,0 +1,282 @@
+import collections
+import csv
+import functools
+import itertools
+import json
+import math
+import os
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from bulletinboard.cache import invalidate_tags
+from bulletinboard.counters import increment
+from bulletinboard.feed import home_feed
+from bulletinboard.jobs import enqueue
+from bulletinboard.models import Category, Post
+from bulletinboard.storage import acquire_blob, content_storage, delete_unreferenced, release_blob
+from bulletinboard.tasks import process_image
+
+from .seed_board import batched
+
+UPDATE_FIELDS = ('author_id', 'category_id', 'announcement_title', 'description', 'price', 'announcement_image')
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_jsonl(handle):
+    for line in handle:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def read_csv(handle):
+    yield from csv.DictReader(handle)
+
+
+class Command(BaseCommand):
+    help = ('Stream announcements from a JSONL or CSV feed (or stdin) into the database in batches. '
+            'Records carry external_id, title, description, price, category, author and image '
+            '(a path to a local file).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file, or - to read stdin')
+        parser.add_argument('--format', choices=('jsonl', 'csv'), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update posts whose external_id already exists instead of skipping them')
+        parser.add_argument('--checkpoint', help='File recording progress; an interrupted import resumes from it')
+        parser.add_argument('--images-dir', default='.', help='Base directory of relative image paths')
+        parser.add_argument('--author', help='Username for records without an author')
+        parser.add_argument('--create-categories', action='store_true', help='Create unknown categories')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.categories = dict(Category.objects.values_list('category_name', 'id'))
+        self.authors = {}
+        self.image_name = functools.lru_cache(maxsize=4096)(self._image_name)
+        self.image_paths = {}
+        source = '-' if options['path'] == '-' else os.path.abspath(options['path'])
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in ('jsonl', 'csv'):
+            raise CommandError('Cannot tell the feed format, pass --format jsonl or --format csv')
+        position = self.load_checkpoint(source)
+        if position:
+            self.stdout.write('Resuming after record {}'.format(position))
+
+        totals = collections.Counter()
+        started = time.monotonic()
+        handle = sys.stdin if source == '-' else open(source, encoding='utf-8-sig', newline='')
+        try:
+            records = read_jsonl(handle) if fmt == 'jsonl' else read_csv(handle)
+            rows = itertools.islice(enumerate(records, 1), position, None)
+            for batch in batched(rows, options['batch_size']):
+                totals.update(self.import_batch(batch))
+                position = batch[-1][0]
+                self.save_checkpoint(source, position)
+                self.stdout.write('{} records: {} created, {} updated, {} skipped, {} errors ({:.0f} records/s)'.format(
+                    position, totals['created'], totals['updated'], totals['skipped'], totals['errors'],
+                    sum(totals.values()) / max(time.monotonic() - started, 1e-6)))
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+        if options['checkpoint'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS('Imported {} posts, updated {}, skipped {}, {} errors'.format(
+            totals['created'], totals['updated'], totals['skipped'], totals['errors'])))
+
+    def load_checkpoint(self, source):
+        path = self.options['checkpoint']
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as handle:
+            checkpoint = json.load(handle)
+        if checkpoint['source'] != source:
+            raise CommandError('Checkpoint {} belongs to {}'.format(path, checkpoint['source']))
+        return checkpoint['position']
+
+    def save_checkpoint(self, source, position):
+        path = self.options['checkpoint']
+        if not path:
+            return
+        with open(path + '.tmp', 'w') as handle:
+            json.dump({'source': source, 'position': position}, handle)
+        os.replace(path + '.tmp', path)
+
+    def parse(self, record):
+        if isinstance(record, str):
+            try:
+                record = json.loads(record)
+            except ValueError as exc:
+                raise RowError('invalid json: {}'.format(exc))
+        if not isinstance(record, dict):
+            raise RowError('record is not an object')
+        return record
+
+    def clean(self, record):
+        title = str(record.get('title') or '').strip()
+        description = str(record.get('description') or '').strip()
+        if not title or len(title) > 200:
+            raise RowError('title must be 1-200 characters')
+        if len(description) > 1500:
+            raise RowError('description is longer than 1500 characters')
+        try:
+            price = float(record.get('price'))
+        except (TypeError, ValueError):
+            raise RowError('invalid price {!r}'.format(record.get('price')))
+        # float() takes 'nan' and 'inf'; SQLite stores NaN as NULL, failing the whole batch
+        if not math.isfinite(price) or price < 0:
+            raise RowError('invalid price {!r}'.format(record.get('price')))
+        return {
+            'external_id': str(record.get('external_id') or '').strip() or None,
+            'announcement_title': title,
+            'description': description,
+            'price': price,
+            'category_id': self.category(str(record.get('category') or '').strip()),
+            'author_id': self.author(str(record.get('author') or self.options['author'] or '').strip()),
+            'announcement_image': self.image(str(record.get('image') or '').strip()),
+        }
+
+    def category(self, name):
+        if name not in self.categories:
+            if not name or not self.options['create_categories']:
+                raise RowError('unknown category {!r}'.format(name))
+            self.categories[name] = Category.objects.create(category_name=name).pk
+        return self.categories[name]
+
+    def resolve_authors(self, records):
+        names = {record.get('author') or self.options['author'] for record in records}
+        missing = {str(name).strip() for name in names if name} - set(self.authors)
+        if missing:
+            found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+            self.authors.update({name: found.get(name) for name in missing})
+
+    def author(self, username):
+        if username not in self.authors:
+            self.resolve_authors([{'author': username}])
+        if self.authors.get(username) is None:
+            raise RowError('unknown author {!r}'.format(username))
+        return self.authors[username]
+
+    def image(self, path):
+        if not path:
+            raise RowError('image is required')
+        try:
+            name, path = self.image_name(path)
+        except OSError as exc:
+            raise RowError('cannot import image {}: {}'.format(path, exc))
+        self.image_paths[name] = path
+        return name
+
+    def _image_name(self, path):
+        path = os.path.join(self.options['images_dir'], path)
+        with open(path, 'rb') as handle:
+            # reads the header only; derivatives are made later by run_worker
+            Image.open(handle).verify()
+            handle.seek(0)
+            # the file is only written once the batch is being saved
+            return content_storage.stored_name('images/' + os.path.basename(path), File(handle)), path
+
+    def store_image(self, name):
+        '''
+            write a new blob of this batch; returns whether the file was created
+        '''
+        if content_storage.exists(name):
+            return False
+        with open(self.image_paths[name], 'rb') as handle:
+            content_storage.save('images/' + os.path.basename(self.image_paths[name]), File(handle))
+        transaction.on_commit(functools.partial(enqueue, process_image, name=name))
+        return True
+
+    def error(self, number, exc, counts):
+        self.stderr.write('record {}: {}'.format(number, exc))
+        counts['errors'] += 1
+
+    def import_batch(self, batch):
+        counts = collections.Counter()
+        self.image_paths = {}
+        parsed = []
+        for number, record in batch:
+            try:
+                parsed.append((number, self.parse(record)))
+            except RowError as exc:
+                self.error(number, exc, counts)
+        self.resolve_authors([record for _, record in parsed])
+        records = {}
+        for number, record in parsed:
+            try:
+                cleaned = self.clean(record)
+            except RowError as exc:
+                self.error(number, exc, counts)
+                continue
+            # a feed repeating an external_id within one batch keeps its last version
+            records[cleaned['external_id'] or ('record', number)] = cleaned
+
+        categories, blobs, released = collections.Counter(), collections.Counter(), []
+        created, updated, touched, stored = [], [], set(), []
+        try:
+            with transaction.atomic():
+                keys = [key for key in records if not isinstance(key, tuple)]
+                existing = Post.objects.in_bulk(keys, field_name='external_id') if keys else {}
+                for key, cleaned in records.items():
+                    post = existing.get(key)
+                    if post is None:
+                        created.append(Post(**cleaned))
+                        categories[cleaned['category_id']] += 1
+                        touched.add(cleaned['category_id'])
+                        blobs[cleaned['announcement_image']] += 1
+                        continue
+                    old_category, old_image = post.category_id, post.announcement_image.name
+                    unchanged = old_image == cleaned['announcement_image'] and all(
+                        getattr(post, field) == cleaned[field] for field in UPDATE_FIELDS if field != 'announcement_image')
+                    if not self.options['upsert'] or unchanged:
+                        counts['skipped'] += 1
+                        continue
+                    for field in UPDATE_FIELDS:
+                        setattr(post, field, cleaned[field])
+                    post.updated_at = timezone.now()
+                    updated.append(post)
+                    touched.update((old_category, post.category_id))
+                    if old_category != post.category_id:
+                        categories[old_category] -= 1
+                        categories[post.category_id] += 1
+                    if old_image != cleaned['announcement_image']:
+                        blobs[cleaned['announcement_image']] += 1
+                        if old_image:
+                            released.append(old_image)
+                # bulk writes skip the model signals, so counters and blob references are kept here;
+                # the search index follows through its triggers
+                for name in blobs:
+                    if self.store_image(name):
+                        stored.append(name)
+                Post.objects.bulk_create(created)
+                if updated:
+                    Post.objects.bulk_update(updated, UPDATE_FIELDS + ('updated_at',))
+                for category_id, delta in categories.items():
+                    if delta:
+                        increment(Category, category_id, 'post_count', delta)
+                for name, count in blobs.items():
+                    acquire_blob(name, count)
+                for name in released:
+                    release_blob(name)
+        except BaseException:
+            # files are not part of the transaction, the new ones nothing refers to go with it
+            for name in stored:
+                delete_unreferenced(name)
+            raise
+        if created or updated:
+            # any edit changes what the cards show, not only a move between categories
+            invalidate_tags('home', 'categories', *['category:{}'.format(pk) for pk in touched])
+            home_feed.changed()
+        counts['created'] += len(created)
+        counts['updated'] += len(updated)
+        return counts
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from bulletinboard.cache import page_cache_stats, reset_page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit and miss counters of the anonymous page cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats()
+        self.stdout.write('hits: {hits}\nmisses: {misses}\nhit ratio: {hit_ratio:.1%}'.format(**stats))
+        if options['reset']:
+            reset_page_cache_stats()
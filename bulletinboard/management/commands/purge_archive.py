@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bulletinboard.archive import purge_archive
+
+
+class Command(BaseCommand):
+    help = ('Delete archived posts, their comments and images in small transactions, '
+            'so a large purge never holds the write lock for long')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, default=52,
+                            help='Purge archived posts published more than this many weeks ago')
+        parser.add_argument('--batch-size', type=int, default=100, help='Posts deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - datetime.timedelta(weeks=options['weeks'])
+        deleted = purge_archive(older_than, batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS('Purged {} archived posts'.format(deleted)))
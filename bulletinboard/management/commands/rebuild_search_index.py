@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bulletinboard.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of announcements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of post ids indexed per statement')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed {} announcements in {:.2f}s'.format(indexed, time.monotonic() - started)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from bulletinboard.counters import repair_comment_counts, repair_post_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount Category.post_count and Post.comment_count and fix rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows repaired per transaction')
+
+    def handle(self, *args, **options):
+        categories = repair_post_counts(options['batch_size'])
+        posts = repair_comment_counts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Repaired post counts of {} categories and comment counts of {} posts'.format(categories, posts)))
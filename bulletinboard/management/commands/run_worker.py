@@ -0,0 +1,81 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bulletinboard.jobs import claim, execute, requeue_stale
+
+
+def _execute(job_id):
+    try:
+        return execute(job_id)
+    finally:
+        # worker threads and processes must not keep connections open between jobs
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails, image processing) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run at the same time')
+        parser.add_argument('--pool', choices=('thread', 'process'), default='thread',
+                            help='Processes suit CPU bound jobs such as image processing')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--stale-timeout', type=int, default=15 * 60,
+                            help='Seconds after which a running job is considered lost and retried')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        worker = '{}:{}'.format(socket.gethostname(), os.getpid())
+        workers = options['workers']
+        if options['pool'] == 'process':
+            # forked children must open their own database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers)
+        else:
+            executor = ThreadPoolExecutor(workers, thread_name_prefix='job')
+        self.stdout.write('Worker {} running {} {} workers'.format(worker, workers, options['pool']))
+        running = set()
+        self.done = self.failed = 0
+        last_sweep = 0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_sweep > 60:
+                    requeued, dead = requeue_stale(options['stale_timeout'])
+                    if requeued or dead:
+                        self.stdout.write('Requeued {} lost jobs, {} dead'.format(requeued, dead))
+                    last_sweep = time.monotonic()
+                free = workers - len(running)
+                ids = claim(worker, free) if free else []
+                running.update(executor.submit(_execute, job_id) for job_id in ids)
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                self.count(finished)
+        except KeyboardInterrupt:
+            self.stopping = True
+        finally:
+            # claimed jobs are finished rather than left to the stale sweep
+            executor.shutdown(wait=True)
+        self.count(running)
+        self.stdout.write('Stopped after {} jobs, {} failed'.format(self.done, self.failed))
+
+    def count(self, futures):
+        for future in futures:
+            if future.result():
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def stop(self, signum, frame):
+        self.stopping = True
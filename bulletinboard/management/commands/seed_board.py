@@ -0,0 +1,227 @@
+import contextlib
+import datetime
+import io
+import itertools
+import math
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from bulletinboard.cache import invalidate_tags
+from bulletinboard.feed import home_feed
+from bulletinboard.images import generate_derivatives
+from bulletinboard.models import Category, Comment, MediaBlob, Post, Profile
+from bulletinboard.storage import content_storage
+
+CATEGORY_NAMES = [
+    'Авто', 'Недвижимость', 'Электроника', 'Одежда', 'Дом и сад', 'Работа', 'Услуги', 'Животные',
+    'Хобби', 'Спорт', 'Детские товары', 'Книги', 'Музыка', 'Мебель', 'Стройматериалы', 'Запчасти',
+    'Бытовая техника', 'Красота', 'Велосипеды', 'Билеты',
+]
+
+WORDS = (
+    'продаю отличный новый бу срочно недорого состояние идеальное торг уместен город доставка телефон '
+    'машина квартира диван стол стул велосипед куртка ботинки ноутбук планшет гараж дача коляска '
+    'холодильник шкаф кровать комплект гарантия оригинал рабочий чистый один владелец пробег сервис '
+    'вопросы звоните пишите обмен самовывоз центр район рядом метро красивый удобный большой маленький'
+).split()
+
+
+@contextlib.contextmanager
+def explicit_dates(model):
+    '''
+        let bulk_create keep the dates we generate instead of auto_now/auto_now_add overwriting them
+    '''
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a deterministic, production-like set of users, posts and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=3000)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--images', type=int, default=8, help='Size of the shared placeholder image pool')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--days', type=int, default=180, help='Spread publication dates over this many days')
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=None,
+                            help='Newest publication date (YYYY-MM-DD), defaults to today')
+
+    def log(self, message):
+        self.stdout.write('[{:7.1f}s] {}'.format(time.monotonic() - self.started, message))
+
+    def handle(self, *args, **options):
+        self.started = time.monotonic()
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = 'seed{}_'.format(options['seed'])
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError('Users with prefix {} already exist, use another --seed'.format(self.prefix))
+        if options['posts'] and not options['users']:
+            raise CommandError('Posts and comments need authors, pass --users 1 or more')
+        if options['posts'] and not options['categories']:
+            raise CommandError('Posts need categories, pass --categories 1 or more')
+        end_date = options['end_date'] or timezone.localdate()
+        self.end = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time(23, 59)))
+        self.days = options['days']
+
+        images = self.image_pool(options['images'])
+        self.log('{} placeholder images'.format(len(images)))
+        with transaction.atomic():
+            users = self.create_users(options['users'], images)
+            self.log('{} users'.format(len(users)))
+            categories = self.create_categories(options['categories'])
+            posts = self.create_posts(options['posts'], options['comments'], users, categories, images)
+            self.log('{} posts'.format(len(posts)))
+            self.create_comments(posts, users)
+            self.log('{} comments'.format(options['comments']))
+        invalidate_tags('home', 'categories', *['category:{}'.format(pk) for pk in categories])
+        home_feed.changed()
+        self.log('done')
+
+    def image_pool(self, size):
+        names = []
+        for index in range(size):
+            image = Image.new('RGB', (1200, 800), tuple(self.rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                left, right = sorted(self.rng.randrange(1200) for _ in range(2))
+                top, bottom = sorted(self.rng.randrange(800) for _ in range(2))
+                draw.rectangle([left, top, right, bottom], fill=tuple(self.rng.randrange(256) for _ in range(3)))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=75)
+            name = content_storage.save('images/seed{}.jpg'.format(index), ContentFile(buffer.getvalue()))
+            generate_derivatives(name)
+            names.append(name)
+        return names
+
+    def skewed(self, count, exponent):
+        # Zipf-like weights: a few categories and sellers hold most announcements
+        return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+    def create_users(self, count, images):
+        password = make_password('seed-password', salt='seedboard')
+        for batch in batched(range(count), self.batch_size):
+            User.objects.bulk_create([
+                User(username='{}{}'.format(self.prefix, index), email='{}{}@example.com'.format(self.prefix, index),
+                     password=password, date_joined=self.end - datetime.timedelta(days=self.rng.randrange(720)))
+                for index in batch
+            ])
+        users = list(User.objects.filter(username__startswith=self.prefix).order_by('id').values_list('id', flat=True))
+        avatars = []
+        for batch in batched(users, self.batch_size):
+            profiles = []
+            for user_id in batch:
+                avatar = self.rng.choice(images) if images and self.rng.random() < 0.3 else ''
+                if avatar:
+                    avatars.append(avatar)
+                profiles.append(Profile(user_id=user_id, avatar=avatar,
+                                        birth_date=datetime.date(1950, 1, 1) + datetime.timedelta(
+                                            days=self.rng.randrange(365 * 55))))
+            Profile.objects.bulk_create(profiles)
+        self.reference_blobs(avatars)
+        return users
+
+    def create_categories(self, count):
+        existing = dict(Category.objects.values_list('category_name', 'id'))
+        names = [CATEGORY_NAMES[index % len(CATEGORY_NAMES)] + ('' if index < len(CATEGORY_NAMES) else
+                                                                ' {}'.format(index // len(CATEGORY_NAMES)))
+                 for index in range(count)]
+        Category.objects.bulk_create([Category(category_name=name) for name in names if name not in existing])
+        existing = dict(Category.objects.filter(category_name__in=names).values_list('category_name', 'id'))
+        return [existing[name] for name in names]
+
+    def text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def create_posts(self, count, comment_total, users, categories, images):
+        if not count:
+            return []
+        category_weights = self.skewed(len(categories), 1.1)
+        author_weights = self.skewed(len(users), 0.8)
+        # comments per post follow a heavy tail: most posts get none, a few get hundreds
+        popularity = [self.rng.paretovariate(1.2) for _ in range(count)]
+        comment_counts = [0] * count
+        for index in self.rng.choices(range(count), weights=popularity, k=comment_total):
+            comment_counts[index] += 1
+        per_category = dict.fromkeys(categories, 0)
+        used_images = []
+        started = Post.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        span = self.days * 24 * 3600
+        with explicit_dates(Post):
+            for batch in batched(range(count), self.batch_size):
+                posts = []
+                for index in batch:
+                    category = self.rng.choices(categories, cum_weights=category_weights)[0]
+                    image = self.rng.choice(images) if images else ''
+                    per_category[category] += 1
+                    used_images.append(image)
+                    published = self.end - datetime.timedelta(seconds=span * (count - index) / count)
+                    posts.append(Post(
+                        author_id=self.rng.choices(users, cum_weights=author_weights)[0],
+                        category_id=category,
+                        announcement_title=self.text(self.rng.randint(2, 6)).capitalize(),
+                        description=self.text(min(250, int(self.rng.lognormvariate(3.2, 0.8))))[:1500],
+                        announcement_image=image,
+                        published_date=published,
+                        updated_at=published,
+                        price=round(math.exp(self.rng.gauss(8, 1.5)), -1),
+                        comment_count=comment_counts[index],
+                    ))
+                Post.objects.bulk_create(posts)
+                self.log('{} posts'.format(batch[-1] + 1))
+        for category, added in per_category.items():
+            if added:
+                Category.objects.filter(pk=category).update(post_count=F('post_count') + added)
+        self.reference_blobs(name for name in used_images if name)
+        ids = list(Post.objects.filter(id__gt=started).order_by('id').values_list('id', 'published_date'))
+        return [(pk, published, comments) for (pk, published), comments in zip(ids, comment_counts)]
+
+    def create_comments(self, posts, users):
+        def comments():
+            for post_id, published, total in posts:
+                age = max((self.end - published).total_seconds(), 1)
+                for _ in range(total):
+                    yield Comment(author_id=self.rng.choice(users), in_post_id=post_id,
+                                  text=self.text(self.rng.randint(3, 40))[:700],
+                                  date_publish=published + datetime.timedelta(seconds=self.rng.random() * age))
+
+        for batch in batched(comments(), self.batch_size):
+            Comment.objects.bulk_create(batch)
+
+    def reference_blobs(self, names):
+        counts = {}
+        for name in names:
+            counts[name] = counts.get(name, 0) + 1
+        for name, count in counts.items():
+            if not MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + count):
+                MediaBlob.objects.create(name=name, refcount=count)
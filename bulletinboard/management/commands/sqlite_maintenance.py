@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from bulletinboard.sqlite import CHECKPOINT_MODES, checkpoint, optimize
+
+
+class Command(BaseCommand):
+    help = ('Checkpoint the SQLite write-ahead log and refresh planner statistics. '
+            'Run it from cron, or keep it running with --every')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--mode', choices=CHECKPOINT_MODES, default='TRUNCATE',
+                            help='TRUNCATE also shrinks the -wal file back to zero bytes')
+        parser.add_argument('--no-optimize', action='store_true', help='Only checkpoint')
+        parser.add_argument('--every', type=float, default=0, help='Repeat every this many seconds')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Database {} is not SQLite'.format(options['database']))
+        while True:
+            busy, log, checkpointed = checkpoint(connection, options['mode'])
+            if not options['no_optimize']:
+                optimize(connection)
+            self.stdout.write('Checkpoint {}: {} of {} log pages copied{}'.format(
+                options['mode'], max(checkpointed, 0), max(log, 0), ', blocked by readers' if busy else ''))
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database into the file given by REPLICA_DATABASE_PATH, '
+            'standing in for replication when the replica is tried locally')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Replica file, defaults to the REPLICA_DATABASE settings')
+        parser.add_argument('--pages', type=int, default=1024, help='Pages copied per step of the backup')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path is None:
+            if not settings.REPLICA_DATABASE:
+                raise CommandError('No replica configured, set REPLICA_DATABASE_PATH or pass --path')
+            path = connections[settings.REPLICA_DATABASE].settings_dict['NAME']
+            path = path[len('file:'):].partition('?')[0] if path.startswith('file:') else path
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('The primary database is not SQLite')
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            # the online backup copies a consistent snapshot while the site keeps writing
+            primary.connection.backup(target, pages=options['pages'])
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS('Replica {} is up to date'.format(path)))
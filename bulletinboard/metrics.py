@@ -0,0 +1,171 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.functional import empty
+
+# seconds, the client library defaults
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICS = (
+    ('bulletinboard_request_duration_seconds', 'Time spent handling the request', DURATION_BUCKETS),
+    ('bulletinboard_sql_duration_seconds', 'Time spent in SQL queries per request', DURATION_BUCKETS),
+    ('bulletinboard_sql_queries', 'SQL queries per request', QUERY_BUCKETS),
+    ('bulletinboard_template_duration_seconds', 'Time spent rendering templates per request', DURATION_BUCKETS),
+    ('bulletinboard_media_duration_seconds', 'Time spent building image urls per request', DURATION_BUCKETS),
+)
+
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # the last slot counts values above the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    '''
+        per process histograms by metric and url name; a request takes the lock once
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, view, values):
+        with self.lock:
+            for (name, _, buckets), value in zip(METRICS, values):
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[name, view] = Histogram(buckets)
+                histogram.observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {key: (list(histogram.counts), histogram.sum) for key, histogram in self.histograms.items()}
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def render(self):
+        '''
+            the histograms in the Prometheus text exposition format
+        '''
+        snapshot = self.snapshot()
+        lines = []
+        for name, description, buckets in METRICS:
+            lines += ['# HELP {} {}'.format(name, description), '# TYPE {} histogram'.format(name)]
+            for (metric, view), (counts, total) in sorted(snapshot.items()):
+                if metric != name:
+                    continue
+                label = 'view="{}"'.format(view.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, label, bound, cumulative))
+                lines.append('{}_sum{{{}}} {}'.format(name, label, repr(total)))
+                lines.append('{}_count{{{}}} {}'.format(name, label, cumulative))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.timings = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_queries += 1
+
+
+@contextmanager
+def timed(name):
+    '''
+        add the time spent in the block to the current request's ``name`` timing
+    '''
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.timings[name] += time.perf_counter() - started
+
+
+def server_timing(view, total, timings):
+    return ', '.join([
+        'total;dur={:.1f};desc="{}"'.format(total * 1000, view),
+        'sql;dur={:.1f};desc="{} queries"'.format(timings.sql_time * 1000, timings.sql_queries),
+        'template;dur={:.1f}'.format(timings.timings['template'] * 1000),
+        'media;dur={:.1f}'.format(timings.timings['media'] * 1000),
+    ])
+
+
+class ProfilingMiddleware:
+    '''
+        records view, total time, SQL count and time and template render time of every request
+        into the /metrics histograms; with DEBUG, or for staff when the view has loaded the
+        user anyway, they are also sent back as a Server-Timing header
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        registry.observe(view, (total, timings.sql_time, timings.sql_queries,
+                                timings.timings['template'], timings.timings['media']))
+        if settings.DEBUG or _resolved_staff(request):
+            response['Server-Timing'] = server_timing(view, total, timings)
+        return response
+
+
+def _resolved_staff(request):
+    # a user the view never looked at is not loaded just for the header
+    user = getattr(request, 'user', None)
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return False
+    return user.is_staff
+
+
+def metrics_view(request):
+    '''
+        histograms of this process for Prometheus; open to METRICS_ALLOWED_IPS and staff
+    '''
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ())
+    if request.META.get('REMOTE_ADDR') not in allowed and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+
+def _normalized(column):
+    return "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')".format(column)
+
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE bulletinboard_post_fts USING fts5("
+    "announcement_title, description, content='', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER bulletinboard_post_fts_insert AFTER INSERT ON bulletinboard_post BEGIN "
+    "INSERT INTO bulletinboard_post_fts(rowid, announcement_title, description) "
+    "VALUES (new.id, {}, {}); END".format(_normalized('new.announcement_title'), _normalized('new.description')),
+    "CREATE TRIGGER bulletinboard_post_fts_delete AFTER DELETE ON bulletinboard_post BEGIN "
+    "INSERT INTO bulletinboard_post_fts(bulletinboard_post_fts, rowid, announcement_title, description) "
+    "VALUES ('delete', old.id, {}, {}); END".format(_normalized('old.announcement_title'),
+                                                    _normalized('old.description')),
+    "CREATE TRIGGER bulletinboard_post_fts_update AFTER UPDATE OF announcement_title, description "
+    "ON bulletinboard_post BEGIN "
+    "INSERT INTO bulletinboard_post_fts(bulletinboard_post_fts, rowid, announcement_title, description) "
+    "VALUES ('delete', old.id, {}, {}); "
+    "INSERT INTO bulletinboard_post_fts(rowid, announcement_title, description) "
+    "VALUES (new.id, {}, {}); END".format(_normalized('old.announcement_title'), _normalized('old.description'),
+                                          _normalized('new.announcement_title'), _normalized('new.description')),
+    "INSERT INTO bulletinboard_post_fts(rowid, announcement_title, description) "
+    "SELECT id, {}, {} FROM bulletinboard_post".format(_normalized('announcement_title'),
+                                                       _normalized('description')),
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS bulletinboard_post_fts_update',
+    'DROP TRIGGER IF EXISTS bulletinboard_post_fts_delete',
+    'DROP TRIGGER IF EXISTS bulletinboard_post_fts_insert',
+    'DROP TABLE IF EXISTS bulletinboard_post_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 and these triggers are SQLite specific
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0002_comment'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
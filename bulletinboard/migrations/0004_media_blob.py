@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:16
+
+import bulletinboard.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0003_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='announcement_image',
+            field=models.ImageField(default=None, storage=bulletinboard.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(default=None, storage=bulletinboard.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+    ]
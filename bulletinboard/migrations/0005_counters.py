@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:19
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total'), output_field=IntegerField()), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    Category = apps.get_model('bulletinboard', 'Category')
+    Post = apps.get_model('bulletinboard', 'Post')
+    Comment = apps.get_model('bulletinboard', 'Comment')
+    Category.objects.update(post_count=_count(Post, 'category'))
+    Post.objects.update(comment_count=_count(Comment, 'in_post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0004_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['in_post', '-date_publish', '-id'], name='comment_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-published_date', '-id'], name='post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', '-published_date', '-id'], name='post_category_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-published_date', '-id'], name='post_author_published_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0006_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='external_id',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 14:40
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def fill_updated_at(apps, schema_editor):
+    # nothing recorded edits so far, the publication date is the best known modification time
+    Post = apps.get_model('bulletinboard', 'Post')
+    Post.objects.update(updated_at=Coalesce(F('published_date'), F('updated_at')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0007_post_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:36
+
+import bulletinboard.storage
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bulletinboard', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPost',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('announcement_title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, max_length=1500)),
+                ('announcement_image', models.ImageField(storage=bulletinboard.storage.ContentAddressedStorage(), upload_to='images/')),
+                ('published_date', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('price', models.FloatField()),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('external_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_posts', to='bulletinboard.Category')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(max_length=700)),
+                ('date_publish', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to=settings.AUTH_USER_MODEL)),
+                ('in_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='bulletinboard.ArchivedPost')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedpost',
+            index=models.Index(fields=['published_date', 'id'], name='archived_post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['in_post', '-date_publish', '-id'], name='archived_comment_post_date_idx'),
+        ),
+    ]
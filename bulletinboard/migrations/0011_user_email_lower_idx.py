@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bulletinboard', '0010_archive'),
+    ]
+
+    operations = [
+        # signup and login by email compare lower(email); Django 2.2 cannot declare expression indexes
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_lower_idx ON auth_user (LOWER(email))',
+            'DROP INDEX IF EXISTS auth_user_email_lower_idx',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bulletinboard', '0011_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['price', 'id'], name='post_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'price', 'id'], name='post_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'published_date', 'price'], name='post_category_facet_idx'),
+        ),
+    ]
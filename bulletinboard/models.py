@@ -2,24 +2,53 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .storage import content_storage
 
-class Profile(models.Model):
+
+class LoadedValuesMixin:
+    '''
+        remembers column values as loaded from the database, to detect changes on save
+    '''
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class CounterFieldsMixin:
+    '''
+        keeps ``counter_fields`` out of regular saves of existing rows; they are only
+        changed with atomic F() updates, so a stale in-memory value must not overwrite them
+    '''
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.counter_fields]
+        super().save(*args, **kwargs)
+
+
+class Profile(LoadedValuesMixin, models.Model):
     '''
         user model
     '''
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='user_profile')
     birth_date = models.DateField('Users date of birth', null=True, blank=True)
-    avatar = models.ImageField(upload_to='images/', default=None)
+    avatar = models.ImageField(upload_to='images/', default=None, storage=content_storage)
 
     def __str__(self):
         return str(self.user.username)
 
 
-class Category(models.Model):
+class Category(CounterFieldsMixin, models.Model):
     '''
         announcements category model
     '''
     category_name = models.CharField(max_length=100)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('post_count',)
 
     def __str__(self):
         return str(self.category_name)
@@ -30,19 +59,39 @@ class PostQuerySet(models.QuerySet):
         from django.utils.timezone import now
         return self.filter(published_date__lte=now())
 
+    def with_related(self):
+        return self.select_related('author', 'category')
+
 
-class Post(models.Model):
+class Post(LoadedValuesMixin, CounterFieldsMixin, models.Model):
     '''
         sale announcement model
     '''
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     announcement_title = models.CharField(max_length=200)
     description = models.TextField(max_length=1500, blank=True)
-    announcement_image = models.ImageField(upload_to='images/', default=None)
+    announcement_image = models.ImageField(upload_to='images/', default=None, storage=content_storage)
     category = models.ForeignKey(Category,  on_delete=models.CASCADE, related_name='posts')
     published_date = models.DateTimeField(blank=True, null=True, auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     price = models.FloatField(blank=True)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # id of the listing in a partner feed, see the import_posts command
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
     objects = PostQuerySet.as_manager()
+    counter_fields = ('comment_count',)
+
+    class Meta:
+        indexes = [
+            # listings page by (published_date, id), see KeysetPaginationMixin
+            models.Index(fields=['-published_date', '-id'], name='post_published_idx'),
+            models.Index(fields=['category', '-published_date', '-id'], name='post_category_published_idx'),
+            models.Index(fields=['author', '-published_date', '-id'], name='post_author_published_idx'),
+            # FilterView sorted by price, and its facet counts grouped by category
+            models.Index(fields=['price', 'id'], name='post_price_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='post_category_price_idx'),
+            models.Index(fields=['category', 'published_date', 'price'], name='post_category_facet_idx'),
+        ]
 
     def __str__(self):
         return 'Announcement: {}, date: {}, Author: {}'.format(
@@ -56,5 +105,92 @@ class Comment(models.Model):
     in_post = models.ForeignKey(Post, on_delete=models.CASCADE)
     date_publish = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['in_post', '-date_publish', '-id'], name='comment_post_date_idx'),
+        ]
+
+    def __str__(self):
+        return "{0} : {1}".format(self.author, self.text[:10] + "...")
+
+
+class ArchivedPost(models.Model):
+    '''
+        post moved out of the hot table by bulletinboard.archive, keeping its id and url
+    '''
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_posts')
+    announcement_title = models.CharField(max_length=200)
+    description = models.TextField(max_length=1500, blank=True)
+    announcement_image = models.ImageField(upload_to='images/', storage=content_storage)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='archived_posts')
+    published_date = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField()
+    price = models.FloatField()
+    comment_count = models.PositiveIntegerField(default=0)
+    external_id = models.CharField(max_length=100, null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_date', 'id'], name='archived_post_published_idx'),
+        ]
+
+    def __str__(self):
+        return 'Archived announcement: {}'.format(self.announcement_title)
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_comments')
+    text = models.TextField(max_length=700)
+    in_post = models.ForeignKey(ArchivedPost, on_delete=models.CASCADE, related_name='comments')
+    date_publish = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['in_post', '-date_publish', '-id'], name='archived_comment_post_date_idx'),
+        ]
+
+    def __str__(self):
+        return "{0} : {1}".format(self.author, self.text[:10] + "...")
+
+
+class MediaBlob(models.Model):
+    '''
+        reference count of a content addressed media file
+    '''
+    name = models.CharField(max_length=255, primary_key=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return '{} ({})'.format(self.name, self.refcount)
+
+
+class Job(models.Model):
+    '''
+        background job run by the run_worker command, see bulletinboard.jobs
+    '''
+    QUEUED, RUNNING, DONE, DEAD = 'queued', 'running', 'done', 'dead'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (DEAD, 'Dead')]
+
+    name = models.CharField(max_length=200)
+    payload = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # workers poll for due jobs in run_at order
+            models.Index(fields=['status', 'run_at'], name='job_status_run_idx'),
+        ]
+
     def __str__(self):
-        return "{0} : {1}".format(self.author, self.text[:10] + "...")
\ No newline at end of file
+        return '{} #{} ({})'.format(self.name, self.pk, self.status)
@@ -0,0 +1,146 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+from .exceptions import InvalidCursor
+
+
+def _json_default(value):
+    # DjangoJSONEncoder drops microseconds, which breaks equality on the cursor row
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPage:
+    '''
+        one page of a keyset paginated queryset
+    '''
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, params=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = params or {}
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _query(self, **cursor):
+        params = {key: value for key, value in self.params.items() if key not in ('after', 'before')}
+        params.update(cursor)
+        return '?' + urlencode(params)
+
+    @property
+    def next_query(self):
+        return self._query(after=self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query(before=self.previous_cursor)
+
+
+class KeysetPaginator:
+    '''
+        cursor pagination over a unique ordering, e.g. ('-published_date', '-id').
+
+        Every page is fetched with a range condition on the ordering columns
+        instead of OFFSET, so page N costs the same as page 1 when an index
+        covers the ordering.
+    '''
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.model = queryset.model
+
+    @staticmethod
+    def _field_name(order):
+        return order.lstrip('-')
+
+    def _values(self, obj):
+        return [getattr(obj, self.model._meta.get_field(self._field_name(order)).attname)
+                for order in self.ordering]
+
+    def encode_cursor(self, obj):
+        raw = json.dumps(self._values(obj), default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            values = json.loads(raw.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        # encode_cursor only writes scalars, and None cannot be compared in _seek
+        if any(value is None or isinstance(value, (list, dict)) for value in values):
+            raise InvalidCursor(cursor)
+        try:
+            return [self.model._meta.get_field(self._field_name(order)).to_python(value)
+                    for order, value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+
+    def _seek(self, values, reverse=False):
+        '''
+            rows strictly after ``values`` in ordering (before them when reverse).
+
+            The leading ``lte``/``gte`` condition lets the database start an index
+            range scan at the cursor instead of filtering from the top of the index.
+        '''
+        def lookup(order, strict):
+            descending = order.startswith('-') != reverse
+            return '{}__{}{}'.format(self._field_name(order), 'lt' if descending else 'gt', '' if strict else 'e')
+
+        condition = Q()
+        for position, order in enumerate(self.ordering):
+            step = Q(**{lookup(order, True): values[position]})
+            for previous, value in zip(self.ordering[:position], values[:position]):
+                step &= Q(**{self._field_name(previous): value})
+            condition |= step
+        return Q(**{lookup(self.ordering[0], False): values[0]}) & condition
+
+    def _reversed_ordering(self):
+        return [order[1:] if order.startswith('-') else '-' + order for order in self.ordering]
+
+    def get_page(self, params=None):
+        params = params or {}
+        after, before = params.get('after'), params.get('before')
+        queryset = self.queryset
+        if before:
+            queryset = queryset.filter(self._seek(self.decode_cursor(before), reverse=True))
+            rows = list(queryset.order_by(*self._reversed_ordering())[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            if after:
+                queryset = queryset.filter(self._seek(self.decode_cursor(after)))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+        if not rows:
+            return KeysetPage(rows, params=params)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous else None,
+            params=params,
+        )
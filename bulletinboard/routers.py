@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'primary_reads'
+STICKY_APPS = ('bulletinboard', 'auth')
+
+_state = threading.local()
+_replica_down_until = 0.0
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias in connections.databases else None
+
+
+def mark_replica_down(alias):
+    '''
+        send reads to the primary for REPLICA_RETRY_SECONDS before trying the replica again
+    '''
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+    try:
+        connections[alias].close()
+    except DatabaseError:
+        pass
+
+
+def replica_available(alias):
+    if time.monotonic() < _replica_down_until:
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        logger.warning('Replica %s is unavailable, reading from the primary', alias, exc_info=True)
+        mark_replica_down(alias)
+        return False
+    return True
+
+
+@contextmanager
+def reading_from(alias):
+    previous = getattr(_state, 'replica', None)
+    _state.replica = alias
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+class ReplicaRouter:
+    '''
+        bulletinboard reads inside views wrapped by replica_reads go to settings.REPLICA_DATABASE;
+        every write, and every read anywhere else, goes to the primary
+    '''
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'bulletinboard':
+            return getattr(_state, 'replica', None)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # session bookkeeping is not something the visitor has to read back
+        if model._meta.app_label in STICKY_APPS:
+            _state.wrote = True
+        # objects read from the replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # the replica gets its schema with the data it copies from the primary
+        if db == replica_alias():
+            return False
+        return None
+
+
+def replica_reads(view_func):
+    '''
+        run a GET view against the replica, unless the visitor wrote something recently or
+        the replica is down; a view failing on the replica is run again on the primary
+    '''
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        if (alias is None or request.method not in ('GET', 'HEAD') or STICKY_COOKIE in request.COOKIES
+                or not replica_available(alias)):
+            return view_func(request, *args, **kwargs)
+        try:
+            with reading_from(alias):
+                request.read_replica = alias
+                response = view_func(request, *args, **kwargs)
+                # lazy templates would otherwise query after the replica is switched off
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                return response
+        except DatabaseError:
+            logger.warning('Reading from replica %s failed, retrying on the primary', alias, exc_info=True)
+            mark_replica_down(alias)
+            request.read_replica = None
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReadYourWritesMiddleware:
+    '''
+        pins a browser to the primary for REPLICA_STICKY_SECONDS after a request that wrote,
+        so authors see their own posts and comments before the replica catches up
+    '''
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if _state.wrote and replica_alias() is not None:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 15),
+                                httponly=True, samesite='Lax')
+        return response
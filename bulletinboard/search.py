@@ -0,0 +1,143 @@
+import re
+
+from django.db import connection, connections
+
+from .models import Post
+
+FTS_TABLE = 'bulletinboard_post_fts'
+
+# title matches weigh more than description matches in bm25()
+TITLE_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# common Russian inflection endings, longest first; stripped before a prefix match
+_RU_ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'ия', 'ие', 'ий', 'ой', 'ый', 'ая',
+    'яя', 'ое', 'ее', 'ые', 'ов', 'ев', 'ей', 'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю', 'а', 'я',
+    'ы', 'и', 'е', 'о', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+
+
+def _normalized_sql(column):
+    return "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')".format(column)
+
+
+TRIGGERS_SQL = {
+    'bulletinboard_post_fts_insert': (
+        'CREATE TRIGGER IF NOT EXISTS bulletinboard_post_fts_insert AFTER INSERT ON bulletinboard_post BEGIN '
+        'INSERT INTO {fts}(rowid, announcement_title, description) VALUES (new.id, {new_title}, {new_desc}); END'
+    ),
+    'bulletinboard_post_fts_delete': (
+        'CREATE TRIGGER IF NOT EXISTS bulletinboard_post_fts_delete AFTER DELETE ON bulletinboard_post BEGIN '
+        "INSERT INTO {fts}({fts}, rowid, announcement_title, description) "
+        "VALUES ('delete', old.id, {old_title}, {old_desc}); END"
+    ),
+    'bulletinboard_post_fts_update': (
+        'CREATE TRIGGER IF NOT EXISTS bulletinboard_post_fts_update '
+        'AFTER UPDATE OF announcement_title, description ON bulletinboard_post BEGIN '
+        "INSERT INTO {fts}({fts}, rowid, announcement_title, description) "
+        "VALUES ('delete', old.id, {old_title}, {old_desc}); "
+        'INSERT INTO {fts}(rowid, announcement_title, description) VALUES (new.id, {new_title}, {new_desc}); END'
+    ),
+}
+
+
+def ensure_triggers(using='default'):
+    '''
+        recreate sync triggers dropped by a table rebuild and reindex, since writes made
+        while they were missing are not in the index. Returns True when anything was missing.
+    '''
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'bulletinboard_post'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS_SQL[name].format(
+                fts=FTS_TABLE,
+                new_title=_normalized_sql('new.announcement_title'), new_desc=_normalized_sql('new.description'),
+                old_title=_normalized_sql('old.announcement_title'), old_desc=_normalized_sql('old.description'),
+            ))
+    if missing:
+        rebuild_index(using=using)
+    return bool(missing)
+
+
+def normalize(text):
+    '''
+        fold text the same way for indexing and querying; unicode61 does not fold ё into е
+    '''
+    return text.replace('ё', 'е').replace('Ё', 'Е')
+
+
+def _stem(word):
+    if len(word) <= 3:
+        return word
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(text):
+    '''
+        turn free user input into an FTS5 expression: every word must match as a prefix of its stem
+    '''
+    words = _WORD_RE.findall(normalize(text).lower())
+    return ' AND '.join('"{}"*'.format(_stem(word)) for word in words)
+
+
+def search_post_ids(text, category_id=None, limit=20, offset=0):
+    match = build_match_query(text)
+    if not match:
+        return []
+    sql = ('SELECT {fts}.rowid FROM {fts} JOIN bulletinboard_post ON bulletinboard_post.id = {fts}.rowid '
+           'WHERE {fts} MATCH %s').format(fts=FTS_TABLE)
+    params = [match]
+    if category_id is not None:
+        sql += ' AND bulletinboard_post.category_id = %s'
+        params.append(category_id)
+    sql += ' ORDER BY bm25({fts}, %s, %s) LIMIT %s OFFSET %s'.format(fts=FTS_TABLE)
+    params += [TITLE_WEIGHT, DESCRIPTION_WEIGHT, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_posts(text, category_id=None, limit=20, offset=0):
+    '''
+        posts ranked by relevance of title and description
+    '''
+    ids = search_post_ids(text, category_id=category_id, limit=limit, offset=offset)
+    posts = Post.objects.with_related().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def rebuild_index(batch_size=10000, using='default'):
+    '''
+        drop the whole index and refill it from bulletinboard_post in id ranges
+    '''
+    indexed = 0
+    with connections[using].cursor() as cursor:
+        cursor.execute("INSERT INTO {fts}({fts}) VALUES('delete-all')".format(fts=FTS_TABLE))
+        cursor.execute('SELECT MIN(id), MAX(id) FROM bulletinboard_post')
+        low, high = cursor.fetchone()
+        if low is None:
+            return indexed
+        for start in range(low, high + 1, batch_size):
+            cursor.execute(
+                'INSERT INTO {fts}(rowid, announcement_title, description) '
+                'SELECT id, {title}, {desc} FROM bulletinboard_post WHERE id >= %s AND id < %s'.format(
+                    fts=FTS_TABLE, title=_normalized_sql('announcement_title'), desc=_normalized_sql('description')),
+                [start, start + batch_size],
+            )
+            indexed += cursor.rowcount
+        cursor.execute("INSERT INTO {fts}({fts}) VALUES('optimize')".format(fts=FTS_TABLE))
+    return indexed
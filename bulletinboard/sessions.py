@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.utils.crypto import get_random_string
+
+VALID_KEY_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+SYNCED_PREFIX = 'bulletinboard.sessions.synced:'
+
+
+class SessionStore(CachedDBStore):
+    '''
+        cached_db sessions that write expiry-only updates behind.
+
+        With SESSION_SAVE_EVERY_REQUEST every response pushes the expiry date forward.
+        When the data did not change that only refreshes the cache, and the database
+        row at most once per SESSION_WRITE_BEHIND seconds. A session read back from the
+        database after a cache eviction can expire up to that much early.
+    '''
+    def _get_new_session_key(self):
+        # inserting a duplicate key raises CreateError and create() tries another,
+        # so the exists() query of the parent class is not needed
+        return get_random_string(32, VALID_KEY_CHARS)
+
+    def _get_session_from_db(self):
+        # only reached on a cache miss; the expiry of this row is written back with the next interval
+        session = super()._get_session_from_db()
+        if session is not None:
+            self._cache.add(SYNCED_PREFIX + session.session_key, True, getattr(settings, 'SESSION_WRITE_BEHIND', 300))
+        return session
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None or self.modified:
+            super().save(must_create)
+            self._cache.set(SYNCED_PREFIX + self.session_key, True, getattr(settings, 'SESSION_WRITE_BEHIND', 300))
+            return
+        self._cache.set(self.cache_key, self._get_session(), self.get_expiry_age())
+        # add() succeeds once per interval, which is when the row catches up
+        if self._cache.add(SYNCED_PREFIX + self.session_key, True, getattr(settings, 'SESSION_WRITE_BEHIND', 300)):
+            self.model.objects.filter(session_key=self.session_key).update(expire_date=self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        session_key = session_key or self.session_key
+        if session_key:
+            self._cache.delete(SYNCED_PREFIX + session_key)
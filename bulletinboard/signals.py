@@ -0,0 +1,163 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .auth import forget_session, forget_user
+from .cache import invalidate_tags
+from .counters import increment
+from .feed import home_feed
+from .models import ArchivedPost, Category, Comment, Post, Profile
+from .search import ensure_triggers
+from .jobs import enqueue
+from .storage import acquire_blob, release_blob
+from .tasks import process_image
+
+IMAGE_FIELDS = {
+    Post: 'announcement_image',
+    ArchivedPost: 'announcement_image',
+    Profile: 'avatar',
+}
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Profile)
+def remember_uploaded_image(sender, instance, **kwargs):
+    # a FieldFile is uncommitted only between assignment of a new upload and the save that stores it
+    image = getattr(instance, IMAGE_FIELDS[sender])
+    instance._image_uploaded = bool(image) and not image._committed
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def process_uploaded_image(sender, instance, **kwargs):
+    if getattr(instance, '_image_uploaded', False):
+        instance._image_uploaded = False
+        enqueue(process_image, name=getattr(instance, IMAGE_FIELDS[sender]).name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def count_image_references(sender, instance, created, **kwargs):
+    attname = IMAGE_FIELDS[sender]
+    loaded = getattr(instance, '_loaded_values', {})
+    old = None if created else loaded.get(attname) or None
+    new = getattr(instance, attname).name or None
+    if old != new:
+        if new:
+            acquire_blob(new)
+        if old:
+            release_blob(old)
+    instance._loaded_values = dict(loaded, **{attname: new})
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+@receiver(post_delete, sender=Profile)
+def release_image_reference(sender, instance, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    if name:
+        release_blob(name)
+
+
+def restore_search_triggers(sender, using='default', **kwargs):
+    # SQLite drops triggers whenever a migration rebuilds bulletinboard_post
+    ensure_triggers(using=using)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {}).get('category_id')
+    instance._moved_from_category_id = loaded if not instance._state.adding and loaded != instance.category_id \
+        else None
+
+
+@receiver(post_save, sender=Post)
+def count_category_posts(sender, instance, created, **kwargs):
+    moved_from = instance._moved_from_category_id
+    if created or moved_from is not None:
+        increment(Category, instance.category_id, 'post_count', 1)
+    if moved_from is not None:
+        increment(Category, moved_from, 'post_count', -1)
+    if hasattr(instance, '_loaded_values'):
+        instance._loaded_values['category_id'] = instance.category_id
+
+
+@receiver(post_delete, sender=Post)
+def uncount_category_post(sender, instance, **kwargs):
+    increment(Category, instance.category_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_post_comments(sender, instance, created, **kwargs):
+    if created:
+        increment(Post, instance.in_post_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_post_comment(sender, instance, **kwargs):
+    increment(Post, instance.in_post_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    tags = {'home', 'categories', 'category:{}'.format(instance.category_id)}
+    moved_from = getattr(instance, '_moved_from_category_id', None)
+    if moved_from is not None:
+        tags.add('category:{}'.format(moved_from))
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=Post)
+def update_home_feed(sender, instance, **kwargs):
+    home_feed.saved(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_home_feed(sender, instance, **kwargs):
+    home_feed.deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_home_feed_comment(sender, instance, created, **kwargs):
+    if created:
+        home_feed.commented(instance.in_post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_home_feed_comment(sender, instance, **kwargs):
+    home_feed.commented(instance.in_post_id, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    invalidate_tags('categories', 'category:{}'.format(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    category_id = Post.objects.filter(pk=instance.in_post_id).values_list('category_id', flat=True).first()
+    tags = ['home']
+    if category_id is not None:
+        tags.append('category:{}'.format(category_id))
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_profile_user(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_session(sender, request, user, **kwargs):
+    forget_session(request.session.session_key)
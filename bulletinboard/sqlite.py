@@ -0,0 +1,49 @@
+from django.conf import settings
+
+# connection-level settings of the production profile; busy_timeout comes first so that
+# switching the journal mode waits for other connections instead of failing
+PRODUCTION_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute('PRAGMA {} = {}'.format(name, value))
+
+
+def configure_connection(sender, connection, **kwargs):
+    '''
+        connection_created receiver applying settings.SQLITE_PRAGMAS to every new sqlite connection
+    '''
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+def checkpoint(connection, mode='TRUNCATE'):
+    '''
+        copy the write-ahead log back into the database; returns (busy, log pages, checkpointed pages)
+    '''
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError('Unknown checkpoint mode {}'.format(mode))
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA wal_checkpoint({})'.format(mode))
+        return cursor.fetchone()
+
+
+def optimize(connection):
+    '''
+        let sqlite refresh the planner statistics it considers stale
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
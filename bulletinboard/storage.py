@@ -0,0 +1,117 @@
+import hashlib
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    '''
+        sha256 of a django File, reusing a digest computed while the upload streamed in
+    '''
+    digest = getattr(content, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        hasher.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''
+        names files by the hash of their content, so each distinct blob is stored once.
+
+        ``images/ab/ab12...ef.jpg`` never changes content, which makes its URL safe to
+        cache forever. Blob lifetime is tracked by MediaBlob reference counts.
+    '''
+    def content_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def is_content_addressed(self, name):
+        stem = posixpath.splitext(posixpath.basename(name))[0]
+        return len(stem) == 64 and posixpath.basename(posixpath.dirname(name)) == stem[:2]
+
+    def stored_name(self, name, content):
+        '''
+            the name ``content`` is saved under, without writing it
+        '''
+        return self.content_name(self.generate_filename(name), content_hash(content))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.stored_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # written by a concurrent save between exists() and here, with these exact bytes
+            return name
+
+    def get_available_name(self, name, max_length=None):
+        # an existing file with this name already holds these exact bytes. FileSystemStorage
+        # asks again when its exclusive create fails; answering with the same name would
+        # loop forever, so the error goes on to _save
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+
+content_storage = ContentAddressedStorage()
+
+
+def acquire_blob(name, count=1):
+    from .models import MediaBlob
+
+    if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + count):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, refcount=count)
+    except IntegrityError:
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+
+def release_blob(name, storage=content_storage):
+    '''
+        drop one reference and delete the file once nothing points at it.
+
+        Names without a MediaBlob row predate reference counting and are never deleted.
+    '''
+    from .models import MediaBlob
+
+    with transaction.atomic():
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+        deleted, _ = MediaBlob.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: delete_unreferenced(name, storage))
+
+
+def delete_unreferenced(name, storage=content_storage):
+    '''
+        delete the file ``name`` and its derivatives unless a MediaBlob row refers to it,
+        e.g. because an upload acquired the blob again after it was released
+    '''
+    from .images import delete_derivatives
+    from .models import MediaBlob
+
+    if MediaBlob.objects.filter(name=name).exists():
+        return
+    storage.delete(name)
+    delete_derivatives(name, storage)
@@ -0,0 +1,37 @@
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
+
+from .cache import invalidate_tags
+from .feed import home_feed
+from .images import generate_derivatives
+from .jobs import task
+from .models import ArchivedPost, Post
+from .storage import content_storage
+
+
+@task(name='bulletinboard.send_email')
+def send_email(subject, body, from_email, to, html=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html is not None:
+        message.attach_alternative(html, 'text/html')
+    message.send()
+
+
+@task(name='bulletinboard.process_image')
+def process_image(name):
+    '''
+        generate derivatives of an uploaded image and refresh the pages already showing it
+    '''
+    if not content_storage.exists(name):
+        # released before the job ran
+        return
+    generate_derivatives(name)
+    # the read-only page of an archived post is validated by its updated_at as well
+    ArchivedPost.objects.filter(announcement_image=name).update(updated_at=timezone.now())
+    posts = Post.objects.filter(announcement_image=name)
+    categories = set(posts.values_list('category_id', flat=True))
+    if categories:
+        # cards and validators are versioned by updated_at
+        posts.update(updated_at=timezone.now())
+        invalidate_tags('home', 'categories', *['category:{}'.format(pk) for pk in categories])
+        home_feed.changed()
@@ -0,0 +1,42 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from bulletinboard.images import FALLBACK_FORMAT, load_manifest
+from bulletinboard.metrics import timed
+
+register = template.Library()
+
+
+def _srcset(storage, candidates):
+    return ', '.join('{} {}w'.format(storage.url(name), width) for name, width in candidates)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', **attrs):
+    '''
+        <picture> with a srcset per derivative format, or a plain <img> until derivatives exist
+
+        {% responsive_image post.announcement_image sizes='320px' class='main-page-list-item-img' alt='img' %}
+    '''
+    if not image:
+        return ''
+    with timed('media'):
+        return _picture(image, sizes, attrs)
+
+
+def _picture(image, sizes, attrs):
+    manifest = load_manifest(image.name, image.storage)
+    if not manifest:
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+    formats = manifest['formats']
+    fallback = formats[FALLBACK_FORMAT[2]]
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, _srcset(image.storage, candidates), sizes)
+         for mime, candidates in formats.items() if mime != FALLBACK_FORMAT[2]),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        sources, image.storage.url(fallback[0][0]), _srcset(image.storage, fallback), sizes, flatatt(attrs),
+    )
@@ -0,0 +1,21 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .metrics import timed
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    '''
+        the django template backend, adding render time of top level templates to the
+        request timings; includes and extends happen inside that render
+    '''
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
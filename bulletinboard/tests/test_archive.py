@@ -0,0 +1,92 @@
+import datetime
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.archive import archive_posts
+from bulletinboard.models import ArchivedComment, ArchivedPost, Category, Comment, MediaBlob, Post
+from bulletinboard.search import search_posts
+from bulletinboard.storage import content_storage
+
+
+class TestArchive(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        self.image = content_storage.save('images/car.jpg', ContentFile(b'not really a jpeg'))
+        now = timezone.now()
+        self.old, self.recent = [], []
+        for weeks, group in ((20, self.old), (30, self.old), (2, self.recent)):
+            post = Post.objects.create(author=self.user, category=self.category, announcement_title='Машина',
+                                       price=100, announcement_image=self.image)
+            Post.objects.filter(pk=post.pk).update(published_date=now - datetime.timedelta(weeks=weeks))
+            Comment.objects.create(author=self.user, in_post=post, text='Торг?', date_publish=now)
+            group.append(post.pk)
+
+    def test_moves_old_posts_and_comments_in_batches(self):
+        self.assertEqual(archive_posts(batch_size=1), 2)
+        self.assertEqual(set(ArchivedPost.objects.values_list('id', flat=True)), set(self.old))
+        self.assertEqual(list(Post.objects.values_list('id', flat=True)), self.recent)
+        self.assertEqual(ArchivedComment.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(ArchivedPost.objects.get(pk=self.old[0]).comment_count, 1)
+        self.assertEqual(Category.objects.get(pk=self.category.pk).post_count, 1)
+        self.assertEqual(len(search_posts('Машина')), 1)
+        # the archive still refers to the image
+        self.assertEqual(MediaBlob.objects.get(name=self.image).refcount, 3)
+
+    def test_archived_post_is_read_only_at_its_url(self):
+        archive_posts()
+        self.client.force_login(self.user)
+        url = reverse('bulletinboard:announcement_detail', args=(self.old[0],))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertContains(response, 'Торг?')
+        self.assertNotContains(response, '<form class="announcement-comment-form"')
+        self.assertNotContains(response, reverse('bulletinboard:edit_announcement', args=(self.old[0],)))
+        self.assertEqual(self.client.get(reverse('bulletinboard:comments', args=(self.old[0],))).status_code, 200)
+        create = reverse('bulletinboard:create_comment', args=(self.old[0],))
+        self.assertEqual(self.client.post(create, {'text': 'Еще продаете?'}).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_purge_deletes_rows_and_unused_media(self):
+        archive_posts()
+        call_command('purge_archive', weeks=25, batch_size=1, pause=0, stdout=io.StringIO())
+        self.assertEqual(list(ArchivedPost.objects.values_list('id', flat=True)), [self.old[0]])
+        self.assertEqual(ArchivedComment.objects.count(), 1)
+        self.assertEqual(MediaBlob.objects.get(name=self.image).refcount, 2)
+
+        Post.objects.get(pk=self.recent[0]).delete()
+        call_command('purge_archive', weeks=0, pause=0, stdout=io.StringIO())
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(MediaBlob.objects.filter(name=self.image).exists())
+
+    def test_archived_post_disappears_from_search_page(self):
+        url = reverse('bulletinboard:search')
+        self.assertEqual(len(self.client.get(url, {'q': 'Машина'}).context['results']), 3)
+        archive_posts()
+        results = self.client.get(url, {'q': 'Машина'}).context['results']
+        self.assertEqual([post.pk for post in results], self.recent)
+
+    def test_purge_releases_shared_image_once_per_post(self):
+        archive_posts()
+        call_command('purge_archive', weeks=0, batch_size=1, pause=0, stdout=io.StringIO())
+        call_command('purge_archive', weeks=0, pause=0, stdout=io.StringIO())
+        # the live post keeps its reference and the file
+        self.assertEqual(MediaBlob.objects.get(name=self.image).refcount, 1)
+        self.assertTrue(content_storage.exists(self.image))
+        self.assertEqual(Post.objects.get(pk=self.recent[0]).announcement_image.name, self.image)
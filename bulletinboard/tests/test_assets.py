@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from bulletinboard.assets import StaticFilesApp, bundle_css, minify_css
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+class TestCssBundles(SimpleTestCase):
+    def test_imports_are_inlined_with_their_urls_rebased(self):
+        sheets = {
+            'app/css/site.css': '@import "parts/card.css";\nbody { color: red; }',
+            'app/css/parts/card.css': '/* cards */\n.card > img {\n    background: url("../../img/bg.jpg");\n}',
+        }
+        css = minify_css(bundle_css('app/css/site.css', sheets.get))
+        self.assertEqual(css, '.card>img{background:url("../img/bg.jpg")}body{color:red}')
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT, STATICFILES_STORAGE='bulletinboard.assets.PipelineStorage')
+class TestStaticPipeline(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(STATIC_ROOT, 'staticfiles.json')) as manifest:
+            cls.manifest = json.load(manifest)['paths']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.app = StaticFilesApp(self.django, STATIC_ROOT, settings.STATIC_URL)
+
+    def django(self, environ, start_response):
+        start_response('200 OK', [])
+        return [b'django']
+
+    def get(self, path, **headers):
+        environ = {'PATH_INFO': path}
+        environ.update(headers)
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'], response['headers'] = status, dict(response_headers)
+        response['body'] = b''.join(self.app(environ, start_response))
+        return response
+
+    def test_stylesheet_is_one_fingerprinted_minified_bundle(self):
+        name = self.manifest['bulletinboard/css/layout.css']
+        self.assertEqual(staticfiles_storage.url('bulletinboard/css/layout.css'), settings.STATIC_URL + name)
+        with open(os.path.join(STATIC_ROOT, name)) as bundle:
+            css = bundle.read()
+        self.assertNotIn('@import', css)
+        self.assertIn('.main-page-list{', css)
+        self.assertIn('url("../img/{}")'.format(os.path.basename(self.manifest['bulletinboard/img/main-bg.jpg'])), css)
+        with open(os.path.join(STATIC_ROOT, name + '.gz'), 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()).decode(), css)
+
+    def test_served_with_negotiated_encoding_and_immutable_caching(self):
+        path = settings.STATIC_URL + self.manifest['bulletinboard/css/layout.css']
+        plain = self.get(path)
+        self.assertEqual(plain['headers']['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(plain['headers']['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        compressed = self.get(path, HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(compressed['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed['body']), plain['body'])
+        revalidated = self.get(path, HTTP_IF_NONE_MATCH=plain['headers']['ETag'])
+        self.assertEqual(revalidated['status'], '304 Not Modified')
+
+    def test_other_paths_reach_django(self):
+        unhashed = self.get(settings.STATIC_URL + 'bulletinboard/css/layout.css')
+        self.assertEqual(unhashed['headers']['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.get(settings.STATIC_URL + 'missing.css')['body'], b'django')
+        self.assertEqual(self.get('/')['body'], b'django')
@@ -0,0 +1,73 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.forms import SignupForm
+from bulletinboard.sessions import SYNCED_PREFIX
+
+
+class TestCachedAuthentication(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', email='Seller@Example.com', password='pass1234')
+        self.page = reverse('bulletinboard:announcements')
+
+    def auth_queries(self, path=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path or self.page)
+        sql = [query['sql'] for query in queries.captured_queries]
+        return response, [query for query in sql if 'django_session' in query or ' FROM "auth_user" WHERE' in query]
+
+    def test_page_views_read_session_and_user_from_cache(self):
+        self.client.login(username='seller', password='pass1234')
+        self.auth_queries()
+        response, queries = self.auth_queries()
+        self.assertEqual(response.context['user'], self.user)
+        self.assertEqual(queries, [])
+
+    def test_user_save_and_logout_invalidate_cached_user(self):
+        self.client.login(username='seller', password='pass1234')
+        self.auth_queries()
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response, queries = self.auth_queries()
+        self.assertEqual(response.context['user'].first_name, 'Иван')
+        self.assertEqual(len(queries), 1)
+
+        self.user.set_password('new-pass1234')
+        self.user.save()
+        self.assertFalse(self.auth_queries()[0].context['user'].is_authenticated)
+
+    def test_expiry_updates_are_written_behind(self):
+        self.client.login(username='seller', password='pass1234')
+        key = self.client.session.session_key
+        stale = timezone.now() + datetime.timedelta(days=1)
+        Session.objects.filter(session_key=key).update(expire_date=stale)
+        self.auth_queries()
+        self.assertEqual(Session.objects.get(session_key=key).expire_date, stale)
+        cache.delete(SYNCED_PREFIX + key)
+        self.auth_queries()
+        self.assertGreater(Session.objects.get(session_key=key).expire_date, stale)
+
+    def test_login_by_email_is_one_indexed_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.client.login(username='seller@example.COM', password='pass1234'))
+        lookups = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')
+                   and 'FROM "auth_user"' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + lookups[0])
+            self.assertIn('auth_user_email_lower_idx', ' '.join(row[-1] for row in cursor.fetchall()))
+        self.assertFalse(self.client.login(username='nobody@example.com', password='pass1234'))
+
+    def test_signup_rejects_email_in_other_case(self):
+        form = SignupForm(data={'username': 'buyer', 'email': 'seller@example.com',
+                                'password1': 'Sup3r-secret', 'password2': 'Sup3r-secret'})
+        self.assertIn('email', form.errors)
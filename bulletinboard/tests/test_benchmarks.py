@@ -0,0 +1,33 @@
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from bulletinboard.benchmarks import WSGIDriver, compare, measure, percentile, routes
+
+
+class TestBenchmarks(TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_compare_flags_slower_routes_and_extra_queries(self):
+        baseline = {'small': {'home': {'p95_ms': 10.0, 'queries': 2}, 'login': {'p95_ms': 4.0, 'queries': 0}}}
+        current = {'small': {'home': {'p95_ms': 10.5, 'queries': 3}, 'login': {'p95_ms': 6.0, 'queries': 0}},
+                   'large': {'home': {'p95_ms': 50.0, 'queries': 2}}}
+        regressions = compare(baseline, current, threshold=10)
+        self.assertEqual([(size, route) for size, route, _ in regressions], [('small', 'home'), ('small', 'login')])
+        self.assertIn('queries 2 -> 3', regressions[0][2])
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_every_route_answers_through_wsgi(self):
+        call_command('seed_board', users=3, posts=10, comments=20, images=1, stdout=io.StringIO())
+        driver = WSGIDriver(User.objects.order_by('id').first())
+        for name, path, authenticated in routes():
+            result = measure(driver, path, authenticated, requests=2, warmup=0)
+            self.assertEqual(result['status'], 200, name)
+            self.assertGreater(result['bytes'], 0)
@@ -0,0 +1,111 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.admin import PostAdmin
+from bulletinboard.cache import page_cache_stats
+from bulletinboard.models import Category, Comment, Post
+
+
+class TestAnonymousPageCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+        self.home = Category.objects.create(category_name='Дом')
+        self.post = self.create('Машина', self.cars)
+
+    def create(self, title, category):
+        return Post.objects.create(author=self.user, announcement_title=title, category=category,
+                                   announcement_image='images/test.jpg', price=1)
+
+    def category_url(self, category):
+        return reverse('bulletinboard:announcements_categories', args=(category.pk,))
+
+    def test_second_anonymous_hit_skips_database(self):
+        first = self.client.get(reverse('bulletinboard:home'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('bulletinboard:home'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(page_cache_stats()['hits'], 1)
+        self.assertEqual(page_cache_stats()['misses'], 1)
+
+    def test_post_write_invalidates_only_affected_pages(self):
+        for url in (reverse('bulletinboard:home'), self.category_url(self.cars), self.category_url(self.home)):
+            self.client.get(url)
+        self.create('Трактор', self.cars)
+        self.assertContains(self.client.get(reverse('bulletinboard:home')), 'Трактор')
+        self.assertContains(self.client.get(self.category_url(self.cars)), 'Трактор')
+        with self.assertNumQueries(0):
+            self.client.get(self.category_url(self.home))
+
+    def test_admin_publish_now_invalidates_category_pages(self):
+        scheduled = self.create('Трактор', self.cars)
+        Post.objects.filter(pk=scheduled.pk).update(published_date=timezone.now() + datetime.timedelta(days=1))
+        self.assertNotContains(self.client.get(self.category_url(self.cars)), 'Трактор')
+        PostAdmin.pub_now(None, None, Post.objects.filter(pk=scheduled.pk))
+        self.assertContains(self.client.get(self.category_url(self.cars)), 'Трактор')
+        self.assertGreater(Post.objects.get(pk=scheduled.pk).updated_at, scheduled.updated_at)
+
+    def test_moving_post_invalidates_old_category(self):
+        self.client.get(self.category_url(self.cars))
+        post = Post.objects.get(pk=self.post.pk)
+        post.category = self.home
+        post.save()
+        self.assertNotContains(self.client.get(self.category_url(self.cars)), 'Машина')
+
+    def test_category_and_comment_writes_invalidate(self):
+        self.client.get(reverse('bulletinboard:categories'))
+        Category.objects.create(category_name='Одежда')
+        self.assertContains(self.client.get(reverse('bulletinboard:categories')), 'Одежда')
+        self.client.get(reverse('bulletinboard:home'))
+        Comment.objects.create(author=self.user, in_post=self.post, text='text')
+        self.assertEqual(page_cache_stats()['hits'], 0)
+        self.client.get(reverse('bulletinboard:home'))
+        self.assertEqual(page_cache_stats()['hits'], 0)
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get(reverse('bulletinboard:home'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('bulletinboard:home'))
+        self.assertContains(response, 'seller')
+        self.assertEqual(page_cache_stats(), {'hits': 0, 'misses': 1, 'hit_ratio': 0.0})
+
+    def test_stats_command(self):
+        self.client.get(reverse('bulletinboard:home'))
+        self.client.get(reverse('bulletinboard:home'))
+        out = io.StringIO()
+        call_command('page_cache_stats', reset=True, stdout=out)
+        self.assertIn('hit ratio: 50.0%', out.getvalue())
+        self.assertEqual(page_cache_stats()['hits'], 0)
+
+
+class TestPostCardCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.post = Post.objects.create(author=self.user, announcement_title='Машина', price=1,
+                                        category=Category.objects.create(category_name='Авто'),
+                                        announcement_image='images/test.jpg')
+        # the announcements page is never page cached, so only the card cache is in play
+        self.client.force_login(self.user)
+        self.url = reverse('bulletinboard:announcements')
+
+    def test_card_is_cached_until_post_changes(self):
+        self.assertContains(self.client.get(self.url), 'Машина')
+        Post.objects.filter(pk=self.post.pk).update(announcement_title='Велосипед')
+        self.assertContains(self.client.get(self.url), 'Машина')
+        self.post.refresh_from_db()
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Велосипед')
+
+    def test_card_follows_comment_count(self):
+        self.assertContains(self.client.get(self.url), 'Отзывов: 0')
+        Comment.objects.create(author=self.user, in_post=self.post, text='Торг?')
+        self.assertContains(self.client.get(self.url), 'Отзывов: 1')
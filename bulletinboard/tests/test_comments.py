@@ -0,0 +1,76 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.models import Category, Comment, Post
+
+
+class TestComments(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='pass1234')
+        self.post = Post.objects.create(author=self.user, announcement_title='Велосипед', price=10,
+                                        category=Category.objects.create(category_name='Авто'),
+                                        announcement_image='images/test.jpg')
+        now = timezone.now()
+        Comment.objects.bulk_create([
+            Comment(author=self.user, in_post=self.post, text='comment {}'.format(i),
+                    date_publish=now - datetime.timedelta(minutes=i // 2))
+            for i in range(45)
+        ])
+        Post.objects.filter(pk=self.post.pk).update(comment_count=45)
+        self.expected = list(Comment.objects.order_by('-date_publish', '-id').values_list('text', flat=True))
+        self.detail = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+        self.comments = reverse('bulletinboard:comments', args=(self.post.pk,))
+        self.create = reverse('bulletinboard:create_comment', args=(self.post.pk,))
+
+    def test_detail_renders_only_newest_page(self):
+        response = self.client.get(self.detail)
+        self.assertEqual([comment.text for comment in response.context['comments']], self.expected[:20])
+        self.assertContains(response, 'announcement-comment-more')
+        self.assertNotContains(response, self.expected[20] + ' ')
+
+    def test_json_pages_walk_every_comment_once(self):
+        texts, params = [], {'format': 'json'}
+        while True:
+            data = json.loads(self.client.get(self.comments, params).content)
+            texts += [comment['text'] for comment in data['comments']]
+            if not data['next_cursor']:
+                break
+            params['after'] = data['next_cursor']
+        self.assertEqual(texts, self.expected)
+
+    def test_fragment_page(self):
+        first = self.client.get(self.detail).context['comments']
+        response = self.client.get(self.comments + first.next_query)
+        self.assertTemplateUsed(response, 'bulletinboard/_comments_page.html')
+        self.assertTemplateNotUsed(response, 'layout.html')
+        self.assertContains(response, self.expected[20] + ' ')
+        self.assertEqual(self.client.get(reverse('bulletinboard:comments', args=(self.post.pk + 1,))).status_code, 404)
+
+    def test_create_returns_only_the_new_comment(self):
+        self.assertEqual(self.client.post(self.create, {'text': 'Торг?'}).status_code, 302)
+        self.client.force_login(self.user)
+        response = self.client.post(self.create, {'text': 'Торг?'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, 'bulletinboard/_comment.html')
+        self.assertTemplateNotUsed(response, 'layout.html')
+        self.assertContains(response, 'Торг?', status_code=201)
+        response = self.client.post(self.create, {'text': 'Обмен?'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(json.loads(response.content)['text'], 'Обмен?')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 47)
+
+    def test_create_rejects_invalid_comment(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.create, {'text': ''}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', json.loads(response.content)['errors'])
+
+    def test_detail_form_post_redirects(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.detail, {'text': 'Торг?'})
+        self.assertRedirects(response, self.detail)
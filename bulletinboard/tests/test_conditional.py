@@ -0,0 +1,80 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.models import Category, Comment, Post
+
+
+class TestConditionalGet(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        self.post = Post.objects.create(author=self.user, announcement_title='Велосипед', category=self.category,
+                                        announcement_image='images/test.jpg', price=10)
+        self.detail = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+        self.listing = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+
+    def revalidate(self, url, response, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    def test_unchanged_detail_is_not_modified(self):
+        response = self.client.get(self.detail)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            revalidated = self.revalidate(self.detail, response)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+        self.assertIn('Cookie', revalidated['Vary'])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_detail_changes_with_comments_and_edits(self):
+        response = self.client.get(self.detail)
+        Comment.objects.create(author=self.user, in_post=self.post, text='Торг?',
+                               date_publish=timezone.now() + datetime.timedelta(seconds=1))
+        response = self.revalidate(self.detail, response)
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.post.announcement_title = 'Горный велосипед'
+        self.post.save()
+        response = self.revalidate(self.detail, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Горный велосипед')
+
+    def test_deleting_newest_comment_changes_detail(self):
+        Comment.objects.create(author=self.user, in_post=self.post, text='Торг?')
+        newest = Comment.objects.create(author=self.user, in_post=self.post, text='Продано?',
+                                        date_publish=timezone.now() + datetime.timedelta(seconds=1))
+        response = self.client.get(self.detail)
+        newest.delete()
+        self.assertEqual(self.revalidate(self.detail, response).status_code, 200)
+
+    def test_listing_changes_with_posts_and_counters(self):
+        response = self.client.get(self.listing)
+        self.assertEqual(self.revalidate(self.listing, response).status_code, 304)
+        # a comment moves no date, but the listing shows the counter
+        Comment.objects.create(author=self.user, in_post=self.post, text='Торг?')
+        response = self.revalidate(self.listing, response)
+        self.assertEqual(response.status_code, 200)
+        Post.objects.create(author=self.user, announcement_title='Самокат', category=self.category,
+                            announcement_image='images/test.jpg', price=5)
+        response = self.revalidate(self.listing, response)
+        self.assertContains(response, 'Самокат')
+
+    def test_home_and_users_get_their_own_validators(self):
+        home = reverse('bulletinboard:home')
+        anonymous = self.client.get(home)
+        self.assertEqual(self.revalidate(home, anonymous).status_code, 304)
+        self.client.force_login(self.user)
+        response = self.revalidate(home, anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(self.revalidate(home, response).status_code, 304)
+
+    def test_missing_post_is_still_not_found(self):
+        url = reverse('bulletinboard:announcement_detail', args=(self.post.pk + 1,))
+        self.assertEqual(self.client.get(url).status_code, 404)
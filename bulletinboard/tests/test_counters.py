@@ -0,0 +1,71 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from bulletinboard.models import Category, Comment, Post
+
+
+class TestDenormalizedCounters(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+        self.home = Category.objects.create(category_name='Дом')
+        self.post = self.create(self.cars)
+
+    def create(self, category):
+        return Post.objects.create(author=self.user, announcement_title='post', category=category,
+                                   announcement_image='images/test.jpg', price=1)
+
+    def counts(self):
+        return dict(Category.objects.values_list('category_name', 'post_count'))
+
+    def test_post_create_move_and_delete(self):
+        second = self.create(self.cars)
+        self.assertEqual(self.counts(), {'Авто': 2, 'Дом': 0})
+        second = Post.objects.get(pk=second.pk)
+        second.category = self.home
+        second.save()
+        second.save()
+        self.assertEqual(self.counts(), {'Авто': 1, 'Дом': 1})
+        second.delete()
+        self.assertEqual(self.counts(), {'Авто': 1, 'Дом': 0})
+
+    def test_comment_create_and_delete(self):
+        comment = Comment.objects.create(author=self.user, in_post=self.post, text='text')
+        Comment.objects.create(author=self.user, in_post=self.post, text='text')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 2)
+        comment.delete()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 1)
+
+    def test_stale_instance_save_keeps_counter(self):
+        Comment.objects.create(author=self.user, in_post=self.post, text='text')
+        self.post.price = 5
+        self.post.save()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 1)
+
+    def test_counter_never_goes_negative(self):
+        Category.objects.filter(pk=self.cars.pk).update(post_count=0)
+        self.post.delete()
+        self.assertEqual(self.counts()['Авто'], 0)
+
+    def test_repair_command(self):
+        Post.objects.bulk_create([Post(author=self.user, announcement_title='bulk', category=self.home,
+                                       announcement_image='images/test.jpg', price=1) for _ in range(3)])
+        Comment.objects.bulk_create([Comment(author=self.user, in_post=self.post, text='text')] * 2)
+        out = io.StringIO()
+        call_command('repair_counters', batch_size=1, stdout=out)
+        self.assertIn('post counts of 1 categories and comment counts of 1 posts', out.getvalue())
+        self.assertEqual(self.counts(), {'Авто': 1, 'Дом': 3})
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 2)
+
+    def test_pages_show_counts_without_aggregates(self):
+        Comment.objects.create(author=self.user, in_post=self.post, text='text')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('bulletinboard:categories'))
+        self.assertContains(response, 'Авто (1)')
+        self.assertContains(self.client.get(reverse('bulletinboard:home')), 'Отзывов: 1')
@@ -0,0 +1,76 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.export import export_rows
+from bulletinboard.models import Category, Comment, Post
+
+
+class TestExport(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='moderator', password='pass1234', is_staff=True)
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+        self.home = Category.objects.create(category_name='Дом')
+        self.old = self.create('Старый велосипед', self.cars, datetime.datetime(2020, 1, 10, 12))
+        self.new = self.create('Новый велосипед', self.cars, datetime.datetime(2020, 2, 1, 12))
+        self.sofa = self.create('Диван, "как новый"', self.home, datetime.datetime(2020, 2, 1, 13))
+        Comment.objects.create(author=self.user, in_post=self.new, text='Торг?')
+        self.url = reverse('bulletinboard:export')
+
+    def create(self, title, category, published):
+        post = Post.objects.create(author=self.user, announcement_title=title, category=category,
+                                   announcement_image='images/test.jpg', price=10)
+        Post.objects.filter(pk=post.pk).update(published_date=timezone.make_aware(published))
+        return post
+
+    def test_only_staff_can_export(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_streams_filtered_csv(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'category': self.cars.pk, 'since': '2020-02-01', 'until': '2020-02-01'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['id'] for row in rows], [str(self.new.pk)])
+        self.assertEqual(rows[0]['category__category_name'], 'Авто')
+        self.assertEqual(rows[0]['comment_count'], '1')
+
+    def test_gzipped_jsonl_comments(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'kind': 'comments', 'format': 'jsonl', 'gzip': 'on'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.jsonl.gz"'))
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['text'] for line in lines], ['Торг?'])
+
+    def test_invalid_filters(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.url, {'since': '2020-03-01', 'until': '2020-02-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_are_fetched_lazily(self):
+        rows = export_rows('posts', chunk_size=2)
+        with self.assertNumQueries(1):
+            self.assertEqual([row[0] for row in rows], [self.old.pk, self.new.pk, self.sofa.pk])
+
+    def test_command_writes_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'posts.csv.gz')
+        call_command('export_posts', 'posts', output=path, gzip=True, since=datetime.date(2020, 2, 1),
+                     stderr=io.StringIO())
+        with gzip.open(path, 'rt') as export:
+            rows = list(csv.DictReader(export))
+        self.assertEqual([row['announcement_title'] for row in rows], ['Новый велосипед', 'Диван, "как новый"'])
@@ -0,0 +1,75 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.feed import LatestPosts, home_feed
+from bulletinboard.models import Category, Comment, Post
+
+
+class FeedMixin:
+    def create_posts(self, count):
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        now = timezone.now()
+        posts = []
+        for index in range(count):
+            post = Post.objects.create(author=self.user, category=self.category, announcement_title=str(index),
+                                       price=index, announcement_image='images/test.jpg')
+            Post.objects.filter(pk=post.pk).update(published_date=now - datetime.timedelta(hours=count - index))
+            posts.append(post)
+        return posts
+
+
+class TestHomeFeed(FeedMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.posts = self.create_posts(10)
+
+    def test_home_shows_the_newest_posts_without_queries(self):
+        self.client.force_login(self.user)
+        url = reverse('bulletinboard:home')
+        response = self.client.get(url)
+        self.assertEqual([card.id for card in response.context['latest_announcements']],
+                         [post.pk for post in self.posts[:1:-1]])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_other_processes_reload_after_a_write(self):
+        worker = LatestPosts(3)
+        self.assertEqual([card.id for card in worker.latest()], [post.pk for post in self.posts[:6:-1]])
+        with self.assertNumQueries(0):
+            worker.latest()
+        self.posts[-1].delete()
+        self.assertEqual([card.id for card in worker.latest()], [post.pk for post in self.posts[-2:5:-1]])
+
+
+class TestHomeFeedUpdates(FeedMixin, TransactionTestCase):
+    # outside a test transaction, so the signals apply writes once they commit
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(home_feed, 'size', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.posts = self.create_posts(3)
+        # the dates were moved by update(), which sends no signals
+        home_feed.load()
+
+    def test_writes_are_applied_in_place(self):
+        post = Post.objects.create(author=self.user, category=self.category, announcement_title='new',
+                                   price=1, announcement_image='images/test.jpg')
+        Comment.objects.create(author=self.user, in_post=post, text='Торг?')
+        with self.assertNumQueries(0):
+            cards = home_feed.latest()
+        self.assertEqual([card.id for card in cards], [post.pk, self.posts[-1].pk])
+        self.assertEqual(cards[0].comment_count, 1)
+
+    def test_deleting_from_a_full_feed_reloads_it(self):
+        self.posts[-1].delete()
+        with self.assertNumQueries(1):
+            cards = home_feed.latest()
+        self.assertEqual([card.id for card in cards], [self.posts[1].pk, self.posts[0].pk])
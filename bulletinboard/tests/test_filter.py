@@ -0,0 +1,76 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.models import Category, Post
+from bulletinboard.views import FilterView
+
+
+class TestFilterView(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='seller', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+        self.flats = Category.objects.create(category_name='Недвижимость')
+        now = timezone.now()
+        for category, price, days in ((self.cars, 500, 1), (self.cars, 3000, 2), (self.cars, 20000, 40),
+                                      (self.flats, 800, 3), (self.flats, 2000000, 5)):
+            post = Post.objects.create(author=user, category=category, announcement_title='post', price=price,
+                                       announcement_image='images/test.jpg')
+            Post.objects.filter(pk=post.pk).update(published_date=now - datetime.timedelta(days=days))
+        self.url = reverse('bulletinboard:filter')
+
+    def prices(self, response):
+        return [post.price for post in response.context['page']]
+
+    def facets(self, response):
+        categories = {name: count for name, count, _, _ in response.context['category_facets']}
+        prices = {low: count for low, _, count, _, _ in response.context['price_facets']}
+        return categories, prices
+
+    def test_combined_filter_and_sort(self):
+        response = self.client.get(self.url, {'category': self.cars.pk, 'max_price': 5000, 'sort': '-price'})
+        self.assertEqual(self.prices(response), [3000, 500])
+        since = (timezone.localdate() - datetime.timedelta(days=10)).isoformat()
+        response = self.client.get(self.url, {'since': since, 'sort': 'price'})
+        self.assertEqual(self.prices(response), [500, 800, 3000, 2000000])
+
+    def test_facets_leave_out_their_own_condition(self):
+        response = self.client.get(self.url, {'category': self.cars.pk, 'max_price': 1000})
+        categories, prices = self.facets(response)
+        self.assertEqual(response.context['total'], 1)
+        # posts under 1000 per category, whichever is selected
+        self.assertEqual(categories, {'Авто': 1, 'Недвижимость': 1})
+        # cars per price bucket, whatever the price filter
+        self.assertEqual(prices[0], 1)
+        self.assertEqual(prices[1000], 1)
+        self.assertEqual(prices[10000], 1)
+        self.assertEqual(prices[500000], 0)
+
+    def test_facets_follow_writes(self):
+        categories, _ = self.facets(self.client.get(self.url))
+        self.assertEqual(categories['Недвижимость'], 2)
+        Post.objects.filter(category=self.flats).first().delete()
+        categories, _ = self.facets(self.client.get(self.url))
+        self.assertEqual(categories['Недвижимость'], 1)
+
+    def test_pages_by_cursor(self):
+        with mock.patch.object(FilterView, 'paginate_by', 2):
+            page = self.client.get(self.url, {'sort': 'price'}).context['page']
+            prices = [post.price for post in page]
+            while page.has_next:
+                page = self.client.get(self.url + page.next_query).context['page']
+                prices += [post.price for post in page]
+        self.assertEqual(prices, [500, 800, 3000, 20000, 2000000])
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {'min_price': 10, 'max_price': 5})
+        self.assertEqual(response.status_code, 400)
+
+    def test_early_since_is_rejected(self):
+        response = self.client.get(self.url, {'since': '0001-01-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.context['form'].errors)
@@ -0,0 +1,95 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from bulletinboard.images import derivative_formats, generate_derivatives, load_manifest
+from bulletinboard.jobs import run_pending
+from bulletinboard.models import Category, Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png_upload(width=1000, height=500, name='upload.png'):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 10, 10, 128)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_DERIVATIVE_WIDTHS=(320, 640, 1280))
+class TestImageDerivatives(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+
+    def create_post(self, image):
+        post = Post.objects.create(author=self.user, announcement_title='post', category=self.category,
+                                   announcement_image=image, price=1)
+        # derivatives are generated by a background job
+        run_pending()
+        return post
+
+    def test_upload_generates_derivatives(self):
+        post = self.create_post(png_upload())
+        manifest = load_manifest(post.announcement_image.name)
+        self.assertEqual(manifest['widths'], [320, 640, 1000])
+        self.assertEqual(len(manifest['formats']), len(derivative_formats()))
+        for name, width in manifest['formats']['image/jpeg']:
+            with Image.open(os.path.join(MEDIA_ROOT, name)) as image:
+                self.assertEqual(image.size[0], width)
+                self.assertEqual(image.format, 'JPEG')
+
+    def test_resave_does_not_regenerate(self):
+        post = self.create_post(png_upload())
+        manifest_path = os.path.join(MEDIA_ROOT, 'derivatives', os.path.splitext(post.announcement_image.name)[0])
+        mtime = os.stat(manifest_path + '.json').st_mtime_ns
+        post.price = 2
+        post.save()
+        self.assertEqual(os.stat(manifest_path + '.json').st_mtime_ns, mtime)
+
+    def test_template_tag_renders_srcset(self):
+        post = self.create_post(png_upload())
+        html = Template("{% load bulletinboard_images %}{% responsive_image image sizes='300px' class='card' %}").render(
+            Context({'image': post.announcement_image}))
+        self.assertIn('<picture>', html)
+        self.assertIn('_320w.jpg 320w', html)
+        self.assertIn('class="card"', html)
+
+    def test_template_tag_falls_back_to_original(self):
+        post = Post(announcement_image='images/missing.jpg')
+        html = Template("{% load bulletinboard_images %}{% responsive_image image alt='img' %}").render(
+            Context({'image': post.announcement_image}))
+        self.assertEqual(html, '<img src="/media/images/missing.jpg" alt="img">')
+
+    def test_missing_manifest_is_not_cached_for_long(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'images'), exist_ok=True)
+        Image.new('RGB', (400, 200)).save(os.path.join(MEDIA_ROOT, 'images', 'queued.jpg'))
+        with mock.patch('bulletinboard.images.MISSING_MANIFEST_CACHE_TIMEOUT', 0):
+            self.assertIsNone(load_manifest('images/queued.jpg'))
+            # the worker of another process writes it without touching this process's cache
+            with mock.patch('bulletinboard.images.cache'):
+                generate_derivatives('images/queued.jpg')
+            self.assertEqual(load_manifest('images/queued.jpg')['widths'], [320, 400])
+
+    def test_backfill_command(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'images'), exist_ok=True)
+        Image.new('RGB', (800, 400)).save(os.path.join(MEDIA_ROOT, 'images', 'legacy.jpg'))
+        self.create_post('images/legacy.jpg')
+        call_command('generate_derivatives', workers=2, stdout=io.StringIO())
+        cache.clear()
+        self.assertEqual(load_manifest('images/legacy.jpg')['widths'], [320, 640, 800])
@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from bulletinboard.models import Category, MediaBlob, Post
+from bulletinboard.search import search_post_ids
+from bulletinboard.storage import content_storage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'test.jpg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestImportPosts(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        shutil.copy(IMAGE, os.path.join(self.directory, 'a.jpg'))
+        shutil.copy(IMAGE, os.path.join(self.directory, 'b.jpg'))
+        self.user = User.objects.create_user(username='partner', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+
+    def record(self, number, **fields):
+        return dict({'external_id': 'ext-{}'.format(number), 'title': 'Велосипед {}'.format(number),
+                     'description': 'горный', 'price': number * 100, 'category': 'Авто',
+                     'author': 'partner', 'image': 'a.jpg'}, **fields)
+
+    def feed(self, records, name='feed.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as feed:
+            for record in records:
+                feed.write((record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)) + '\n')
+        return path
+
+    def run_import(self, path, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_posts', path, images_dir=self.directory, batch_size=2,
+                     stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_batches_and_keeps_counters(self):
+        path = self.feed([self.record(1), self.record(2), 'not json', self.record(3, author='nobody'),
+                          self.record(4, category='Дом')])
+        stdout, stderr = self.run_import(path, create_categories=True)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn('4 records: 2 created', stdout)
+        self.assertIn('record 3: invalid json', stderr)
+        self.assertIn("record 4: unknown author 'nobody'", stderr)
+        self.cars.refresh_from_db()
+        self.assertEqual(self.cars.post_count, 2)
+        self.assertEqual(Category.objects.get(category_name='Дом').post_count, 1)
+        # both files hold the same bytes, so one blob is referenced by every post
+        self.assertEqual(list(MediaBlob.objects.values_list('refcount', flat=True)), [3])
+        self.assertEqual(len(search_post_ids('велосипед')), 3)
+
+    def test_bad_price_skips_only_its_record(self):
+        path = self.feed([self.record(1, price='nan'), self.record(2), self.record(3, price='inf'),
+                          self.record(4, price=-5)])
+        stdout, stderr = self.run_import(path)
+        self.assertEqual(list(Post.objects.values_list('external_id', flat=True)), ['ext-2'])
+        self.assertIn("record 1: invalid price 'nan'", stderr)
+        self.assertIn("record 3: invalid price 'inf'", stderr)
+        self.assertIn('record 4: invalid price -5', stderr)
+
+    def test_existing_external_ids_are_skipped_or_updated(self):
+        self.run_import(self.feed([self.record(1), self.record(2)]))
+        home = Category.objects.create(category_name='Дом')
+        path = self.feed([self.record(1, title='Самокат', category='Дом'), self.record(2)], name='again.jsonl')
+        stdout, _ = self.run_import(path)
+        self.assertIn('0 created, 0 updated, 2 skipped', stdout)
+        stdout, _ = self.run_import(path, upsert=True)
+        self.assertIn('0 created, 1 updated, 1 skipped', stdout)
+        post = Post.objects.get(external_id='ext-1')
+        self.assertEqual((post.announcement_title, post.category), ('Самокат', home))
+        self.assertEqual(list(Category.objects.order_by('id').values_list('post_count', flat=True)), [1, 1])
+        self.assertEqual(search_post_ids('самокат'), [post.pk])
+
+    def test_upsert_of_card_fields_invalidates_pages(self):
+        self.run_import(self.feed([self.record(1)]))
+        path = self.feed([self.record(1, price=150)], name='again.jsonl')
+        with mock.patch('bulletinboard.management.commands.import_posts.invalidate_tags') as invalidate, \
+                mock.patch('bulletinboard.management.commands.import_posts.home_feed') as feed:
+            stdout, _ = self.run_import(path, upsert=True)
+        self.assertIn('0 created, 1 updated', stdout)
+        invalidate.assert_called_once_with('home', 'categories', 'category:{}'.format(self.cars.pk))
+        feed.changed.assert_called_once_with()
+
+    def test_failed_batch_removes_its_new_files(self):
+        Image.new('RGB', (8, 8), 'red').save(os.path.join(self.directory, 'c.png'))
+        with open(os.path.join(self.directory, 'c.png'), 'rb') as handle:
+            name = content_storage.stored_name('images/c.png', File(handle))
+        with mock.patch('bulletinboard.management.commands.import_posts.acquire_blob', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.run_import(self.feed([self.record(1, image='c.png')]))
+        self.assertFalse(content_storage.exists(name))
+        self.assertFalse(Post.objects.exists())
+
+    def test_resumes_from_checkpoint(self):
+        path = os.path.join(self.directory, 'feed.csv')
+        with open(path, 'w') as feed:
+            feed.write('external_id,title,description,price,category,author,image\n')
+            for number in range(1, 6):
+                feed.write('ext-{0},Велосипед {0},,{0}00,Авто,partner,a.jpg\n'.format(number))
+        checkpoint = os.path.join(self.directory, 'feed.checkpoint')
+        with open(checkpoint, 'w') as handle:
+            json.dump({'source': path, 'position': 3}, handle)
+        stdout, _ = self.run_import(path, checkpoint=checkpoint)
+        self.assertIn('Resuming after record 3', stdout)
+        self.assertEqual(sorted(Post.objects.values_list('external_id', flat=True)), ['ext-4', 'ext-5'])
+        self.assertFalse(os.path.exists(checkpoint))
@@ -0,0 +1,101 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.jobs import claim, enqueue, requeue_stale, run_pending, task
+from bulletinboard.models import Job
+
+CALLS = []
+
+
+@task(name='tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@task(name='tests.explode')
+def explode():
+    raise RuntimeError('boom')
+
+
+class TestJobs(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueued_job_runs_once(self):
+        job = enqueue(record, value=7)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(CALLS, [7])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    def test_claim_is_exclusive(self):
+        enqueue(record, value=1)
+        enqueue(record, value=2)
+        self.assertEqual(len(claim('first', 10)), 2)
+        self.assertEqual(claim('second', 10), [])
+
+    def test_future_jobs_wait(self):
+        enqueue(record, delay=60, value=1)
+        self.assertEqual(run_pending(), 0)
+
+    def test_failures_back_off_then_die(self):
+        job = enqueue(explode, max_attempts=2)
+        with self.assertLogs('bulletinboard.jobs', 'WARNING'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('bulletinboard.jobs', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+
+    def test_lost_jobs_are_requeued(self):
+        job = enqueue(record, value=1)
+        claim('crashed', 1)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(requeue_stale(60), (1, 0))
+        run_pending()
+        self.assertEqual(CALLS, [1])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue('tests.missing')
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_password_reset_mail_is_queued(self):
+        User.objects.create_user(username='seller', email='seller@example.com', password='pass1234')
+        response = self.client.post(reverse('bulletinboard:password_reset'), {'email': 'seller@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Job.objects.get().name, 'bulletinboard.send_email')
+        run_pending()
+        self.assertEqual(mail.outbox[0].to, ['seller@example.com'])
+
+
+class TestRunWorker(TransactionTestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_thread_pool_drains_queue(self):
+        for value in range(6):
+            enqueue(record, value=value)
+        enqueue(explode, max_attempts=1)
+        stdout = io.StringIO()
+        # one worker thread: the shared in-memory test database locks whole tables between connections
+        with self.assertLogs('bulletinboard.jobs', 'ERROR'):
+            call_command('run_worker', workers=1, once=True, poll_interval=0.01, stdout=stdout)
+        self.assertEqual(sorted(CALLS), list(range(6)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 6)
+        self.assertEqual(Job.objects.get(name='tests.explode').status, Job.DEAD)
+        self.assertIn('Stopped after 6 jobs, 1 failed', stdout.getvalue())
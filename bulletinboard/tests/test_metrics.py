@@ -0,0 +1,86 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from bulletinboard.metrics import ProfilingMiddleware, Registry, registry
+from bulletinboard.models import Category, Post
+
+
+class TestProfilingMiddleware(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.post = Post.objects.create(author=self.user, announcement_title='Велосипед', price=10,
+                                        category=Category.objects.create(category_name='Авто'),
+                                        announcement_image='images/test.jpg')
+        self.detail = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+
+    def test_server_timing_for_staff_only(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.detail))
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.client.force_login(self.user)
+        timing = self.client.get(self.detail)['Server-Timing']
+        self.assertIn('desc="bulletinboard:announcement_detail"', timing)
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'template;dur=[\d.]+')
+        with override_settings(DEBUG=True):
+            self.client.logout()
+            self.assertIn('Server-Timing', self.client.get(self.detail))
+
+    def test_server_timing_does_not_load_the_user(self):
+        self.user.is_staff = True
+        load_user = mock.Mock(return_value=self.user)
+
+        def view(request):
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(load_user)
+        self.assertNotIn('Server-Timing', ProfilingMiddleware(view)(request))
+        load_user.assert_not_called()
+
+        def user_view(request):
+            request.user.pk
+            return HttpResponse()
+
+        request.user = SimpleLazyObject(load_user)
+        self.assertIn('Server-Timing', ProfilingMiddleware(user_view)(request))
+
+    def test_metrics_endpoint(self):
+        self.client.get(self.detail)
+        self.client.get(self.detail)
+        # behind the proxy every request comes from a local address
+        self.assertEqual(self.client.get(reverse('bulletinboard:metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.5']):
+            response = self.client.get(reverse('bulletinboard:metrics'), REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE bulletinboard_request_duration_seconds histogram', text)
+        self.assertIn('bulletinboard_request_duration_seconds_count{view="bulletinboard:announcement_detail"} 2',
+                      text)
+        self.assertIn('bulletinboard_sql_queries_bucket{view="bulletinboard:announcement_detail",le="+Inf"} 2', text)
+        self.assertEqual(self.client.get(reverse('bulletinboard:metrics'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+
+class TestRegistry(SimpleTestCase):
+    def test_concurrent_observations_are_not_lost(self):
+        metrics = Registry()
+
+        def observe():
+            for _ in range(1000):
+                metrics.observe('home', (0.02, 0.001, 3, 0.01, 0.0))
+
+        threads = [threading.Thread(target=observe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        text = metrics.render()
+        self.assertIn('bulletinboard_request_duration_seconds_bucket{view="home",le="0.01"} 0', text)
+        self.assertIn('bulletinboard_request_duration_seconds_bucket{view="home",le="0.025"} 8000', text)
+        self.assertIn('bulletinboard_sql_queries_count{view="home"} 8000', text)
@@ -0,0 +1,90 @@
+import base64
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bulletinboard.models import Category, Post
+from bulletinboard.pagination import KeysetPaginator
+
+
+class TestKeysetPagination(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        self.other = Category.objects.create(category_name='Дом')
+        Post.objects.bulk_create([
+            Post(author=self.user, announcement_title='post {}'.format(i), announcement_image='images/test.jpg',
+                 category=self.category if i % 2 else self.other, price=i)
+            for i in range(45)
+        ])
+        # pairs of posts share a timestamp so the id tiebreak is exercised
+        base = timezone.now() - datetime.timedelta(days=1)
+        for post in Post.objects.all():
+            Post.objects.filter(pk=post.pk).update(published_date=base + datetime.timedelta(minutes=post.pk // 2))
+        self.expected = list(Post.objects.order_by('-published_date', '-id').values_list('id', flat=True))
+
+    def walk(self, queryset):
+        paginator = KeysetPaginator(queryset, ('-published_date', '-id'), 20)
+        page = paginator.get_page({})
+        pages = [page]
+        while page.has_next:
+            page = paginator.get_page({'after': page.next_cursor})
+            pages.append(page)
+        return paginator, pages
+
+    def test_forward_walk_returns_every_post_once(self):
+        _, pages = self.walk(Post.objects.all())
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual([post.id for page in pages for post in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertTrue(pages[-1].has_previous)
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator, pages = self.walk(Post.objects.all())
+        previous = paginator.get_page({'before': pages[2].previous_cursor})
+        self.assertEqual([post.id for post in previous], [post.id for post in pages[1]])
+        first = paginator.get_page({'before': pages[1].previous_cursor})
+        self.assertEqual([post.id for post in first], [post.id for post in pages[0]])
+        self.assertFalse(first.has_previous)
+
+    def test_page_query_count_is_constant(self):
+        paginator, pages = self.walk(Post.objects.all())
+        with self.assertNumQueries(1):
+            paginator.get_page({'after': pages[1].next_cursor})
+
+    def test_announcements_view_pages(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('bulletinboard:announcements'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post.id for post in response.context['announcements']], self.expected[:20])
+        response = self.client.get(reverse('bulletinboard:announcements') + response.context['page'].next_query)
+        self.assertEqual([post.id for post in response.context['announcements']], self.expected[20:40])
+
+    def test_category_view_pages(self):
+        url = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+        expected = list(Post.objects.filter(category=self.category)
+                        .order_by('-published_date', '-id').values_list('id', flat=True))
+        response = self.client.get(url)
+        page = response.context['page']
+        self.assertEqual([post.id for post in page], expected[:20])
+        response = self.client.get(url + page.next_query)
+        self.assertEqual([post.id for post in response.context['page']], expected[20:])
+        self.assertFalse(response.context['page'].has_next)
+
+    def test_invalid_cursor_is_not_found(self):
+        url = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+        response = self.client.get(url, {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_crafted_cursors_are_not_found(self):
+        url = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+        for raw in ('[null,1]', '[1,1]', '[[1],2]', '[{"a":1},1]', '[true,"x"]'):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+            with self.subTest(raw=raw):
+                self.assertEqual(self.client.get(url, {'after': cursor}).status_code, 404)
+                self.assertEqual(self.client.get(url, {'before': cursor}).status_code, 404)
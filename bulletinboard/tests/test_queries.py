@@ -0,0 +1,119 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from bulletinboard.models import Category, Comment, Post, Profile
+from bulletinboard.tests.utils import QueryBudgetMixin, QueryPlanMixin
+
+
+class TestViewQueryBudgets(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        Profile.objects.create(user=self.user, avatar='images/test.jpg')
+        self.category = Category.objects.create(category_name='Авто')
+        self.post = Post.objects.create(author=self.user, announcement_title='first', category=self.category,
+                                        announcement_image='images/test.jpg', price=1)
+
+    @staticmethod
+    def created(model, objects):
+        # bulk_create does not set primary keys on SQLite
+        model.objects.bulk_create(objects)
+        return list(model.objects.order_by('-id')[:len(objects)])
+
+    def users(self, count):
+        start = User.objects.count()
+        return self.created(User, [User(username='user{}'.format(start + i)) for i in range(count)])
+
+    def fill_posts(self, size, **kwargs):
+        missing = size - Post.objects.count()
+        if missing <= 0:
+            return
+        authors = self.users(missing) if 'author' not in kwargs else None
+        categories = self.created(Category, [Category(category_name='c') for _ in range(missing)])
+        Post.objects.bulk_create([
+            Post(**dict({'author': authors[i] if authors else None, 'category': categories[i]}, **kwargs),
+                 announcement_title='post', announcement_image='images/test.jpg', price=i)
+            for i in range(missing)
+        ])
+
+    def fill_comments(self, size):
+        missing = size - Comment.objects.count()
+        authors = self.users(missing)
+        Comment.objects.bulk_create([Comment(author=author, in_post=self.post, text='text') for author in authors])
+
+    # the cache is cleared before every request, so pages with conditional GET
+    # also pay for computing their validators
+
+    def test_home_page(self):
+        self.assertQueryBudget(self.fill_posts, lambda: self.client.get(reverse('bulletinboard:home')), 2)
+
+    def test_announcements_page(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget(self.fill_posts, lambda: self.client.get(reverse('bulletinboard:announcements')), 3)
+
+    def test_categories_page(self):
+        self.assertQueryBudget(self.fill_posts, lambda: self.client.get(reverse('bulletinboard:categories')), 1)
+
+    def test_category_announcements_page(self):
+        url = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+        self.assertQueryBudget(lambda size: self.fill_posts(size, category=self.category),
+                               lambda: self.client.get(url), 2)
+
+    def test_announcement_detail_page(self):
+        url = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+        self.assertQueryBudget(self.fill_comments, lambda: self.client.get(url), 3)
+
+    def test_profile_page(self):
+        url = reverse('bulletinboard:profile', args=(self.user.pk,))
+        self.assertQueryBudget(lambda size: self.fill_posts(size, author=self.user), lambda: self.client.get(url), 2)
+
+    def test_filter_page(self):
+        # categories, results, their authors and categories and the facet counts
+        url = reverse('bulletinboard:filter')
+        self.assertQueryBudget(self.fill_posts, lambda: self.client.get(url, {'min_price': 1, 'sort': 'price'}), 5)
+
+
+class TestViewQueryPlans(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='seller', password='pass1234', email='s@example.com')
+        Profile.objects.create(user=self.user, avatar='images/test.jpg')
+        self.category = Category.objects.create(category_name='Авто')
+        Post.objects.bulk_create([Post(author=self.user, announcement_title='post', category=self.category,
+                                       announcement_image='images/test.jpg', price=i) for i in range(30)])
+        self.post = Post.objects.first()
+        Comment.objects.bulk_create([Comment(author=self.user, in_post=self.post, text='text')] * 5)
+
+    def test_listing_pages_use_indexes(self):
+        self.client.force_login(self.user)
+        listing = reverse('bulletinboard:announcements')
+        page = self.client.get(listing).context['page']
+        self.assertIndexedPlans(lambda: self.client.get(listing + page.next_query))
+        url = reverse('bulletinboard:announcements_categories', args=(self.category.pk,))
+        self.assertIndexedPlans(lambda: self.client.get(url))
+        self.assertIndexedPlans(lambda: self.client.get(reverse('bulletinboard:profile', args=(self.user.pk,))))
+
+    def test_filter_page_uses_indexes(self):
+        # the facet query relies on a skip-scan, which sqlite plans only with statistics
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        url = reverse('bulletinboard:filter')
+        for params in ({}, {'sort': 'price'}, {'sort': '-price', 'min_price': 5},
+                       {'category': self.category.pk, 'sort': 'price'}, {'category': self.category.pk, 'since': '2020-01-01'}):
+            page = self.client.get(url, params).context['page']
+            self.assertIndexedPlans(lambda: self.client.get(url + page.next_query),
+                                    allow_scans=('bulletinboard_category',))
+
+    def test_detail_page_uses_indexes(self):
+        url = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+        self.assertIndexedPlans(lambda: self.client.get(url))
+
+    def test_admin_date_filter_uses_index(self):
+        self.client.force_login(self.user)
+        url = reverse('admin:bulletinboard_post_changelist')
+        self.assertIndexedPlans(lambda: self.client.get(url, {'published_date__gte': '2000-01-01'}),
+                                allow_scans=('django_content_type', 'bulletinboard_category'))
+
+    def test_full_scan_is_reported(self):
+        with self.assertRaises(AssertionError):
+            self.assertIndexedPlans(lambda: list(Post.objects.order_by('description')))
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from bulletinboard import routers
+from bulletinboard.models import Category, Post
+
+
+@override_settings(REPLICA_DATABASE='replica')
+class TestReplicaRouter(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # a second connection to the test database stands in for the replica
+        connections.databases['replica'] = dict(connections['default'].settings_dict)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+
+    def setUp(self):
+        routers._replica_down_until = 0.0
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.post = Post.objects.create(author=self.user, announcement_title='Велосипед', price=10,
+                                        category=Category.objects.create(category_name='Авто'),
+                                        announcement_image='images/test.jpg')
+        self.detail = reverse('bulletinboard:announcement_detail', args=(self.post.pk,))
+
+    def get(self, path, alias='replica'):
+        with CaptureQueriesContext(connections[alias]) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_listing_and_detail_read_from_replica(self):
+        for path in (reverse('bulletinboard:categories'), self.detail,
+                     reverse('bulletinboard:announcements_categories', args=(self.post.category_id,))):
+            self.assertGreater(self.get(path), 0, path)
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.client.post(reverse('bulletinboard:login'), {'username': 'seller', 'password': 'pass1234'})
+        self.assertEqual(len(queries), 0)
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('bulletinboard:create_comment', args=(self.post.pk,)), {'text': 'Торг?'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.get(self.detail), 0)
+        self.client.cookies.pop(routers.STICKY_COOKIE)
+        self.assertGreater(self.get(self.detail), 0)
+
+    def test_falls_back_to_primary_when_replica_is_down(self):
+        replica = connections['replica']
+        name = replica.settings_dict['NAME']
+        replica.close()
+        replica.settings_dict['NAME'] = 'file:/nonexistent/replica.sqlite3?mode=ro'
+        self.addCleanup(replica.settings_dict.__setitem__, 'NAME', name)
+        with self.assertLogs('bulletinboard.routers', 'WARNING'):
+            self.assertGreater(self.get(self.detail, alias='default'), 0)
+        self.assertGreater(routers._replica_down_until, 0)
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from bulletinboard.models import Category, Post
+from bulletinboard.search import build_match_query, ensure_triggers, search_posts
+
+
+class TestSearch(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.cars = Category.objects.create(category_name='Авто')
+        self.home = Category.objects.create(category_name='Дом')
+        self.car = self.create('Продаю машину', 'Отличная машина, один владелец', self.cars)
+        self.garage = self.create('Гараж', 'Гараж для машины, рядом с домом', self.home)
+        self.tree = self.create('Ёлка новогодняя', 'Пушистая ёлка', self.home)
+
+    def create(self, title, description, category):
+        return Post.objects.create(author=self.user, announcement_title=title, description=description,
+                                   category=category, announcement_image='images/test.jpg', price=10)
+
+    def test_match_query_stems_russian_words(self):
+        self.assertEqual(build_match_query('Машины'), '"машин"*')
+        self.assertEqual(build_match_query('"ёлка" OR'), '"елк"* AND "or"*')
+        self.assertEqual(build_match_query('  ,, '), '')
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(search_posts('машина'), [self.car, self.garage])
+
+    def test_case_and_yo_folding(self):
+        self.assertEqual(search_posts('ЕЛКУ'), [self.tree])
+
+    def test_category_filter(self):
+        self.assertEqual(search_posts('машина', category_id=self.home.pk), [self.garage])
+
+    def test_index_follows_update_and_delete(self):
+        self.car.announcement_title = 'Продаю велосипед'
+        self.car.description = ''
+        self.car.save()
+        self.assertEqual(search_posts('велосипед'), [self.car])
+        self.assertEqual(search_posts('машина'), [self.garage])
+        self.garage.delete()
+        self.assertEqual(search_posts('машина'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO bulletinboard_post_fts(bulletinboard_post_fts) VALUES('delete-all')")
+        self.assertEqual(search_posts('гараж'), [])
+        call_command('rebuild_search_index', batch_size=1, stdout=open('/dev/null', 'w'))
+        self.assertEqual(search_posts('гараж'), [self.garage])
+
+    def test_missing_triggers_are_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER bulletinboard_post_fts_insert')
+        self.create('Велосипед', '', self.cars)
+        self.assertEqual(search_posts('велосипед'), [])
+        self.assertTrue(ensure_triggers())
+        self.assertFalse(ensure_triggers())
+        self.assertEqual(len(search_posts('велосипед')), 1)
+
+    def test_search_view(self):
+        response = self.client.get(reverse('bulletinboard:search'), {'q': 'машина', 'category': self.cars.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results'], [self.car])
+        self.assertContains(response, 'Продаю машину')
@@ -0,0 +1,65 @@
+import datetime
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from bulletinboard.models import Category, Comment, MediaBlob, Post, Profile
+from bulletinboard.search import search_post_ids
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestSeedBoard(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def seed(self, **options):
+        options = dict({'users': 20, 'posts': 300, 'comments': 500, 'images': 2, 'batch_size': 64,
+                        'end_date': datetime.date(2020, 12, 1), 'stdout': io.StringIO()}, **options)
+        call_command('seed_board', **options)
+
+    def snapshot(self):
+        return list(Post.objects.order_by('id').values_list(
+            'announcement_title', 'category__category_name', 'price', 'published_date', 'comment_count'))
+
+    def test_creates_consistent_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Profile.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertEqual(sum(Category.objects.values_list('post_count', flat=True)), 300)
+        self.assertEqual(sum(Post.objects.values_list('comment_count', flat=True)), 500)
+        self.assertEqual(sum(MediaBlob.objects.values_list('refcount', flat=True)),
+                         300 + Profile.objects.exclude(avatar='').count())
+        self.assertTrue(search_post_ids('продаю'))
+
+    def test_category_distribution_is_skewed(self):
+        self.seed()
+        counts = sorted(Category.objects.values_list('post_count', flat=True), reverse=True)
+        self.assertGreater(counts[0], 4 * counts[-1])
+
+    def test_same_seed_gives_same_data(self):
+        self.seed(seed=7)
+        first = self.snapshot()
+        for model in (Comment, Post, Profile, User, Category, MediaBlob):
+            model.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_refuses_posts_without_users(self):
+        with self.assertRaises(CommandError):
+            self.seed(users=0, posts=5)
+        self.assertFalse(Post.objects.exists())
+
+    def test_refuses_to_seed_twice(self):
+        self.seed(posts=1, comments=0)
+        with self.assertRaises(CommandError):
+            self.seed(posts=1, comments=0)
@@ -0,0 +1,40 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from bulletinboard.benchmarks import sqlite_stress
+from bulletinboard.sqlite import PRODUCTION_PRAGMAS, apply_pragmas, configure_connection
+
+
+class TestSqliteProfile(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA {}'.format(name))
+            return cursor.fetchone()[0]
+
+    def restore(self, pragmas):
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        defaults = {'cache_size': self.pragma('cache_size'), 'busy_timeout': self.pragma('busy_timeout')}
+        self.addCleanup(self.restore, defaults)
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -4000, 'busy_timeout': 1234}):
+            configure_connection(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4000)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_maintenance_command(self):
+        output = io.StringIO()
+        call_command('sqlite_maintenance', stdout=output)
+        self.assertIn('Checkpoint TRUNCATE', output.getvalue())
+
+
+class TestSqliteStress(SimpleTestCase):
+    def test_wal_profile_has_no_lock_errors(self):
+        result = sqlite_stress(PRODUCTION_PRAGMAS, readers=2, writers=2, seconds=0.5, posts=50)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['reads'], 0)
+        self.assertGreater(result['writes'], 0)
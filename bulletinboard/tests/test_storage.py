@@ -0,0 +1,129 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from bulletinboard.models import ArchivedPost, Category, MediaBlob, Post
+from bulletinboard.storage import acquire_blob, content_storage, release_blob
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestContentAddressedStorage(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        with open(os.path.join(os.path.dirname(__file__), 'static', 'test.jpg'), 'rb') as image:
+            self.image = image.read()
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        os.makedirs(MEDIA_ROOT)
+
+    def create_post(self, image):
+        return Post.objects.create(author=self.user, announcement_title='post', category=self.category,
+                                   announcement_image=image, price=1)
+
+    def upload(self, name='photo.JPG'):
+        return SimpleUploadedFile(name, self.image, content_type='image/jpeg')
+
+    def media_files(self):
+        return sorted(os.path.relpath(os.path.join(path, name), MEDIA_ROOT)
+                      for path, _, names in os.walk(os.path.join(MEDIA_ROOT, 'images')) for name in names)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.create_post(self.upload('one.jpg'))
+        second = self.create_post(self.upload('two.JPG'))
+        self.assertEqual(first.announcement_image.name, second.announcement_image.name)
+        self.assertRegex(first.announcement_image.name, r'^images/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(self.media_files(), [first.announcement_image.name])
+        self.assertEqual(MediaBlob.objects.get(name=first.announcement_image.name).refcount, 2)
+
+    def test_blob_is_deleted_with_last_reference(self):
+        first = self.create_post(self.upload())
+        second = self.create_post(self.upload())
+        name = first.announcement_image.name
+        first.delete()
+        self.assertEqual(self.media_files(), [name])
+        second.delete()
+        self.assertEqual(self.media_files(), [])
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(os.path.exists(os.path.join(MEDIA_ROOT, 'derivatives', name[:-4] + '.json')))
+
+    def test_replacing_image_releases_old_blob(self):
+        post = self.create_post(self.upload())
+        old = post.announcement_image.name
+        post = Post.objects.get(pk=post.pk)
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'PNG')
+        post.announcement_image = SimpleUploadedFile('other.png', buffer.getvalue())
+        post.save()
+        self.assertEqual(self.media_files(), [post.announcement_image.name])
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+
+    def test_concurrent_save_of_same_content(self):
+        name = content_storage.save('images/photo.jpg', self.upload())
+        # the other writer finishes between exists() and the exclusive create
+        with mock.patch.object(type(content_storage), 'exists', side_effect=[False, True]):
+            self.assertEqual(content_storage.save('images/photo.jpg', self.upload()), name)
+        self.assertEqual(self.media_files(), [name])
+
+    def test_released_blob_acquired_again_before_commit_is_kept(self):
+        post = self.create_post(self.upload())
+        name = post.announcement_image.name
+        with transaction.atomic():
+            release_blob(name)
+            # an upload of the same bytes between the release and its deferred delete
+            acquire_blob(name)
+        self.assertEqual(self.media_files(), [name])
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+    def test_dedup_command(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'images'), exist_ok=True)
+        for name, content in (('a.jpg', self.image), ('a_x1y2z3.jpg', self.image), ('b.jpg', b'other')):
+            with open(os.path.join(MEDIA_ROOT, 'images', name), 'wb') as handle:
+                handle.write(content)
+        Post.objects.bulk_create([
+            Post(author=self.user, announcement_title='post', category=self.category, price=1,
+                 announcement_image=name) for name in ('images/a.jpg', 'images/a_x1y2z3.jpg')
+        ])
+        out = io.StringIO()
+        call_command('dedup_media', stdout=out)
+        self.assertIn('2 files renamed, 1 duplicates removed', out.getvalue())
+        names = set(Post.objects.values_list('announcement_image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(len(self.media_files()), 2)
+        self.assertIn(name, self.media_files())
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 2)
+
+    def test_dedup_command_keeps_archived_images(self):
+        os.makedirs(os.path.join(MEDIA_ROOT, 'images'), exist_ok=True)
+        for name in ('a.jpg', 'a_x1y2z3.jpg'):
+            with open(os.path.join(MEDIA_ROOT, 'images', name), 'wb') as handle:
+                handle.write(self.image)
+        post = Post.objects.create(author=self.user, announcement_title='post', category=self.category, price=1,
+                                   announcement_image='images/a.jpg')
+        archived = ArchivedPost.objects.create(id=post.pk + 1, author=self.user, announcement_title='old',
+                                               category=self.category, price=1, updated_at=post.updated_at,
+                                               announcement_image='images/a_x1y2z3.jpg')
+        call_command('dedup_media', stdout=io.StringIO())
+        archived.refresh_from_db()
+        name = Post.objects.get(pk=post.pk).announcement_image.name
+        self.assertEqual(archived.announcement_image.name, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 2)
+        # the archived post's reference keeps the file once the live post is gone
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(self.media_files(), [name])
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
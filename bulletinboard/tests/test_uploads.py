@@ -0,0 +1,75 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from bulletinboard.models import Category, Post, Profile
+
+
+def image_bytes(size=(20, 20), image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class TestStreamedUploads(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='seller', password='pass1234')
+        self.category = Category.objects.create(category_name='Авто')
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+        self.url = reverse('bulletinboard:create_announcement')
+
+    def create(self, content, name='car.png'):
+        token = self.client.get(self.url).context['csrf_token']
+        return self.client.post(self.url, {
+            'csrfmiddlewaretoken': str(token), 'announcement_title': 'Машина', 'category': self.category.pk,
+            'price': 100, 'announcement_image': SimpleUploadedFile(name, content),
+        })
+
+    def test_upload_is_hashed_while_it_streams(self):
+        content = image_bytes()
+        self.assertTrue(self.create(content).context['post_was_created'])
+        name = Post.objects.get().announcement_image.name
+        self.assertEqual(os.path.basename(name), hashlib.sha256(content).hexdigest() + '.png')
+
+    def test_csrf_is_still_checked(self):
+        response = self.client.post(self.url, {'announcement_title': 'Машина',
+                                               'announcement_image': SimpleUploadedFile('car.png', image_bytes())})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(UPLOAD_MAX_BYTES=1024 * 1024)
+    def test_oversized_file_is_dropped(self):
+        response = self.create(image_bytes() + b'\0' * 2 * 1024 * 1024)
+        self.assertFalse(response.context['post_was_created'])
+        self.assertEqual(response.context['form'].errors['announcement_image'], ['Файл больше 1 МБ'])
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'images')))
+
+    @override_settings(UPLOAD_MAX_PIXELS=100)
+    def test_too_many_pixels_are_rejected_by_the_header(self):
+        response = self.create(image_bytes(size=(20, 20)))
+        self.assertFalse(response.context['post_was_created'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_profile_rejects_unsupported_formats(self):
+        Profile.objects.create(user=self.user)
+        url = reverse('bulletinboard:edit_profile', args=(self.user.pk,))
+        token = self.client.get(url).context['csrf_token']
+        response = self.client.post(url, {'csrfmiddlewaretoken': str(token), 'birth_date': '01-01-1990',
+                                          'user': self.user.pk,
+                                          'avatar': SimpleUploadedFile('me.bmp', image_bytes(image_format='BMP'))})
+        self.assertEqual(response.context['form'].errors['avatar'], ['Формат BMP не поддерживается'])
@@ -1,34 +1,34 @@
-import codecs
 import os
 import tempfile
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.urls import reverse
 
-from progect.bulletinboard.models import Post
+from bulletinboard.models import Category, Post
 
 
 class TestIndexView(TestCase):
 
-    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
     def setUp(self):
+        cache.clear()
         dir_ = os.path.dirname(os.path.abspath(__file__))
         image = os.path.join(dir_, 'static', 'test.jpg')
-        f = codecs.open(image, encoding='base64')
-        self.image = SimpleUploadedFile(f.name, f.read())
-        f.close()
+        with open(image, 'rb') as f:
+            self.image = SimpleUploadedFile('test.jpg', f.read(), content_type='image/jpeg')
 
     def test_index_page_without_posts(self):
         response = self.client.get(reverse('bulletinboard:home'))
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Объявлений нет')
 
-    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
     def test_index_page_with_post(self):
         user = User.objects.create_user(username='username', password='pass1234')
+        category = Category.objects.create(category_name='test ct')
         post = Post.objects.create(author=user, announcement_title='test_prod', description='',
-                                   announcement_image=self.image, category='test ct')
+                                   announcement_image=self.image, category=category, price=100)
         response = self.client.get(reverse('bulletinboard:home'))
         self.assertEqual(response.status_code, 200)
-        self.assertQuerysetEqual(response.context['latest_announcements'], [post], transform=lambda x: x)
+        self.assertEqual([card.id for card in response.context['latest_announcements']], [post.pk])
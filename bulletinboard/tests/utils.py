@@ -0,0 +1,65 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$')
+
+
+class QueryBudgetMixin:
+    '''
+        TestCase mixin asserting that a view's query count does not grow with the row count
+    '''
+    budget_sizes = (10, 100, 1000)
+
+    def assertQueryBudget(self, fill, request, max_queries, sizes=None):
+        '''
+            ``fill(n)`` brings the table up to ``n`` rows, ``request()`` hits the view.
+            Fails when any size needs more than ``max_queries`` or when the count changes
+            between sizes, which is what an N+1 looks like.
+        '''
+        counts = {}
+        for size in sizes or self.budget_sizes:
+            fill(size)
+            # budgets are about rendering from the database, not from the page cache
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertEqual(response.status_code, 200)
+            counts[size] = len(queries)
+            self.assertLessEqual(
+                counts[size], max_queries,
+                'Query budget of {} exceeded with {} rows:\n{}'.format(
+                    max_queries, size, '\n'.join(query['sql'] for query in queries.captured_queries)),
+            )
+        self.assertEqual(len(set(counts.values())), 1, 'Query count grows with rows: {}'.format(counts))
+        return counts
+
+
+class QueryPlanMixin:
+    '''
+        TestCase mixin running EXPLAIN QUERY PLAN on the queries a view executes
+    '''
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlans(self, request, allow_scans=()):
+        '''
+            fails when a query of ``request()`` reads a table without an index or sorts
+            in a temporary b-tree; ``allow_scans`` lists tables that are read whole on purpose
+        '''
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            request()
+        for query in queries.captured_queries:
+            if not query['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            for step in self.query_plan(query['sql']):
+                scan = FULL_SCAN_RE.match(step)
+                if scan and scan.group(1) not in allow_scans:
+                    self.fail('Full scan of {} in:\n{}'.format(scan.group(1), query['sql']))
+                if 'TEMP B-TREE' in step:
+                    self.fail('Temporary sort ({}) in:\n{}'.format(step, query['sql']))
@@ -0,0 +1,110 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+
+def max_upload_bytes():
+    return getattr(settings, 'UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def max_upload_pixels():
+    return getattr(settings, 'UPLOAD_MAX_PIXELS', 40 * 1000 * 1000)
+
+
+def check_image_header(file):
+    '''
+        reason to reject ``file`` judging by its image header, or None; pixels are never decoded
+    '''
+    try:
+        # Image.open stops after the header, the pixel data is only read by load()
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        return 'Изображение слишком большое'
+    except (OSError, SyntaxError, ValueError):
+        # left to the form field, which explains what it expects
+        return None
+    finally:
+        file.seek(0)
+    if image_format not in getattr(settings, 'UPLOAD_IMAGE_FORMATS', IMAGE_FORMATS):
+        return 'Формат {} не поддерживается'.format(image_format)
+    if width * height > max_upload_pixels():
+        return 'Изображение больше {} мегапикселей'.format(max_upload_pixels() // 1000000)
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    '''
+        streams every uploaded file to a temporary file chunk by chunk, so memory does not
+        grow with the upload. The sha256 is taken on the way for ContentAddressedStorage;
+        a file is dropped as soon as it passes UPLOAD_MAX_BYTES, or when its header shows
+        an unsupported format or more than UPLOAD_MAX_PIXELS pixels. Reasons are kept in
+        request.rejected_uploads by field name.
+    '''
+    chunk_size = 64 * 1024
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def reject(self, message):
+        if not hasattr(self.request, 'rejected_uploads'):
+            self.request.rejected_uploads = {}
+        self.request.rejected_uploads[self.field_name] = message
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > max_upload_bytes():
+            self.reject('Файл больше {} МБ'.format(max_upload_bytes() // (1024 * 1024)))
+            # the parser closes, and so deletes, the temporary file and discards the rest
+            raise SkipFile()
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        error = check_image_header(file)
+        if error is not None:
+            self.reject(error)
+            file.close()
+            return None
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+def streamed_uploads(view_func):
+    '''
+        parse the request body of ``view_func`` with ImageUploadHandler only.
+
+        CsrfViewMiddleware reads request.POST before the view runs, which would parse
+        the body with the default handlers, so the csrf check is moved after the
+        handlers are replaced.
+    '''
+    protected = csrf_protect(view_func)
+
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def report_rejected_uploads(request, form):
+    '''
+        add the reasons ImageUploadHandler dropped files for to the bound ``form``
+    '''
+    for field, message in getattr(request, 'rejected_uploads', {}).items():
+        if field not in form.fields:
+            form.add_error(None, message)
+            continue
+        # instead of the 'required' error of a file that never arrived
+        form.errors.pop(field, None)
+        form.add_error(field, message)
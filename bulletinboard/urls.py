@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, reverse_lazy
 from django.views.generic import TemplateView
 
+from .metrics import metrics_view
 from .views import *
 
 app_name = 'bulletinboard'
@@ -10,7 +11,13 @@ urlpatterns = [
     path('categories/', CategoryView.as_view(), name='categories'),
     path('announcement/', AnnouncementsPageView.as_view(), name='announcements'),
     path('announcement/<int:post_id>', AnnouncementView.as_view(), name='announcement_detail'),
+    path('announcement/<int:post_id>/comments/', CommentsView.as_view(), name='comments'),
+    path('announcement/<int:post_id>/comments/new/', CreateCommentView.as_view(), name='create_comment'),
     path('categories/<int:category_id>', AnnouncementCategoryView.as_view(), name='announcements_categories'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('filter/', FilterView.as_view(), name='filter'),
+    path('export/', ExportView.as_view(), name='export'),
+    path('metrics', metrics_view, name='metrics'),
     path('create/', CreateAnnouncementView.as_view(), name='create_announcement'),
     path('announcement/<int:post_id>/edit/', EditAnnouncementView.as_view(), name='edit_announcement'),
     path('announcement/<int:post_id>/delete/', login_required(DeleteAnnouncementView.as_view()),
@@ -21,6 +28,7 @@ urlpatterns = [
 
 from django.contrib.auth.views import PasswordResetDoneView, PasswordResetView, PasswordResetConfirmView, \
     PasswordResetCompleteView
+from .forms import QueuedPasswordResetForm
 
 PasswordResetConfirmView.success_url = reverse_lazy('bulletinboard:password_reset_complete')
 
@@ -31,6 +39,7 @@ urlpatterns += [
     path('<int:user_id>/profile/', ProfileView.as_view(), name='profile'),
     path('<int:user_id>/profile/edit', login_required(EditProfileView.as_view()), name='edit_profile'),
     path('password-reset/', PasswordResetView.as_view(success_url=reverse_lazy('bulletinboard:password_reset_done'),
+                                                      form_class=QueuedPasswordResetForm,
                                                       template_name='my_auth/password_reset.html',
                                                       email_template_name="my_auth/password_reset_email.html"),
          name='password_reset'),
@@ -1,55 +1,139 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max, OuterRef, Subquery, prefetch_related_objects
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.http import urlencode
 from django.views.generic import ListView, View, DetailView, CreateView, UpdateView, DeleteView
-from .exceptions import PermissionDenied
+from .cache import anonymous_page_cache, conditional_page
+from .exceptions import PermissionDenied, InvalidCursor
+from .export import export_stream
+from .feed import home_feed
+from .filters import SORTS, category_choices, facet_counts, filter_posts
 from bulletinboard import models
 from .models import Post, Category, Profile
-from .forms import AnnouncementPostForm, LoginForm, SignupForm, UpdateProfileForm, CommentForm
+from .forms import AnnouncementPostForm, LoginForm, SignupForm, UpdateProfileForm, CommentForm, ExportForm, FilterForm
+from .pagination import KeysetPaginator
+from .routers import replica_reads
+from .search import search_posts
+from .uploads import report_rejected_uploads, streamed_uploads
 
 
+class KeysetPaginationMixin:
+    paginate_by = 20
+    ordering = ('-published_date', '-id')
+
+    def paginate(self, queryset):
+        paginator = KeysetPaginator(queryset, self.ordering, self.paginate_by)
+        try:
+            return paginator.get_page(self.request.GET)
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+
+
+def newest_post_validators(**filters):
+    newest = models.Post.objects.publish().filter(**filters).aggregate(newest=Max('published_date'))['newest']
+    return (newest,)
+
+
+def home_validators():
+    cards = home_feed.latest()
+    return (cards[0].published_date if cards else None,)
+
+
+def category_validators(category_id):
+    return newest_post_validators(category_id=category_id)
+
+
+def post_validators(post_id):
+    last_comment = models.Comment.objects.filter(in_post=OuterRef('pk')).order_by('-date_publish', '-id')
+    values = (models.Post.objects.filter(pk=post_id)
+              .annotate(last_comment=Subquery(last_comment.values('date_publish')[:1]))
+              .values_list('updated_at', 'last_comment', 'comment_count').first())
+    if values is None:
+        # archived posts no longer change until they are purged, apart from their image derivatives
+        return (models.ArchivedPost.objects.filter(pk=post_id)
+                .values_list('archived_at', 'updated_at', 'comment_count').first())
+    return values
+
+
+@method_decorator(conditional_page(home_validators, 'home'), name='dispatch')
+@method_decorator(anonymous_page_cache('home'), name='dispatch')
 class HomePageView(ListView):
     model = Post
     template_name = 'bulletinboard/index.html'
     context_object_name = "latest_announcements"
 
     def get_queryset(self):
-        return models.Post.objects.annotate()[:8]
+        return home_feed.latest()
 
 
-class AnnouncementsPageView(View):
+@method_decorator(replica_reads, name='dispatch')
+class AnnouncementsPageView(KeysetPaginationMixin, View):
     template_name = 'bulletinboard/announcements.html'
 
     def get(self, request, *args, **kwargs):
         if request.user.is_authenticated:
             context = {}
-            posts = models.Post.objects.annotate()
-            context['announcements'] = posts
+            page = self.paginate(models.Post.objects.publish().with_related())
+            context['announcements'] = page.object_list
+            context['page'] = page
             return render(request, self.template_name, context)
         else:
             return render(request, self.template_name)
 
 
-class AnnouncementView(DetailView):
+class CommentPaginationMixin(KeysetPaginationMixin):
+    paginate_by = 20
+    ordering = ('-date_publish', '-id')
+
+    def comments_page(self, post_id, archived=False):
+        model = models.ArchivedComment if archived else models.Comment
+        return self.paginate(model.objects.filter(in_post_id=post_id).select_related('author'))
+
+
+def wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.META.get('HTTP_ACCEPT', '')
+
+
+def comment_json(comment):
+    return {'id': comment.id, 'author': comment.author.username, 'text': comment.text,
+            'date_publish': comment.date_publish.isoformat()}
+
+
+@method_decorator(replica_reads, name='dispatch')
+@method_decorator(conditional_page(post_validators), name='dispatch')
+class AnnouncementView(CommentPaginationMixin, DetailView):
     model = Post
+    queryset = Post.objects.with_related()
     pk_url_kwarg = 'post_id'
     comment_form = CommentForm
     template_name = 'bulletinboard/announcement_detail.html'
 
     def get(self, request, post_id, *args, **kwargs):
-        self.object = self.get_object()
+        try:
+            self.object = self.get_object()
+        except Http404:
+            return self.archived(post_id)
         context = self.get_context_data(object=self.object)
-        context['comments'] = models.Comment.objects.filter(in_post__pk=post_id).order_by('-date_publish')
+        context['comments'] = self.comments_page(self.object.pk)
         context['comment_form'] = None
         if request.user.is_authenticated:
             context['comment_form'] = self.comment_form
         return self.render_to_response(context)
 
+    def archived(self, post_id):
+        self.object = get_object_or_404(models.ArchivedPost.objects.select_related('author', 'category'), pk=post_id)
+        context = self.get_context_data(object=self.object, post=self.object, archived=True)
+        context['comments'] = self.comments_page(self.object.pk, archived=True)
+        return self.render_to_response(context)
+
     @method_decorator(login_required)
     def post(self, request, post_id, *args, **kwargs):
-        post = get_object_or_404(Post, pk=post_id)
+        post = get_object_or_404(self.queryset, pk=post_id)
         form = self.comment_form(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
@@ -57,17 +141,60 @@ class AnnouncementView(DetailView):
             comment.author = request.user
             comment.in_post = post
             comment.save()
-            return render(request=request, template_name=self.template_name, context={'comment_form': self.comment_form,
-                                                                                      'post': post,
-                                                                                      'comments': post.comment_set.order_by(
-                                                                                          '-date_publish')})
+            return redirect('bulletinboard:announcement_detail', post_id=post.pk)
         else:
             return render(request=request, template_name=self.template_name, context={'comment_form': form,
                                                                                       'post': post,
-                                                                                      'comments': post.comment_set.order_by(
-                                                                                          '-date_publish')})
+                                                                                      'comments': self.comments_page(post.pk)})
+
 
+@method_decorator(replica_reads, name='dispatch')
+class CommentsView(CommentPaginationMixin, View):
+    '''
+        one page of a post's comments, newest first, as an html fragment or json
+    '''
+    template_name = 'bulletinboard/_comments_page.html'
 
+    def get(self, request, post_id, *args, **kwargs):
+        archived = False
+        if not models.Post.objects.filter(pk=post_id).exists():
+            if not models.ArchivedPost.objects.filter(pk=post_id).exists():
+                raise Http404("No such announcement")
+            archived = True
+        page = self.comments_page(post_id, archived)
+        if wants_json(request):
+            return JsonResponse({'comments': [comment_json(comment) for comment in page],
+                                 'next_cursor': page.next_cursor})
+        return render(request, self.template_name, {'comments': page, 'post_id': post_id})
+
+
+@method_decorator(login_required, name='dispatch')
+class CreateCommentView(View):
+    '''
+        stores a comment and answers with just that comment, as an html fragment or json
+    '''
+    template_name = 'bulletinboard/_comment.html'
+
+    def post(self, request, post_id, *args, **kwargs):
+        if not models.Post.objects.filter(pk=post_id).exists():
+            raise Http404("No such announcement")
+        form = CommentForm(request.POST)
+        if not form.is_valid():
+            if wants_json(request):
+                return JsonResponse({'errors': form.errors}, status=400)
+            return HttpResponseBadRequest(form.errors.as_text())
+        comment = form.save(commit=False)
+        comment.date_publish = timezone.now()
+        comment.author = request.user
+        comment.in_post_id = post_id
+        comment.save()
+        if wants_json(request):
+            return JsonResponse(comment_json(comment), status=201)
+        return render(request, self.template_name, {'comment': comment}, status=201)
+
+
+@method_decorator(replica_reads, name='dispatch')
+@method_decorator(anonymous_page_cache('categories'), name='dispatch')
 class CategoryView(View):
     template_name = 'bulletinboard/category.html'
 
@@ -78,17 +205,117 @@ class CategoryView(View):
         return render(request, self.template_name, context)
 
 
-class AnnouncementCategoryView(View):
+@method_decorator(replica_reads, name='dispatch')
+@method_decorator(conditional_page(category_validators, 'category:{category_id}'), name='dispatch')
+@method_decorator(anonymous_page_cache('category:{category_id}'), name='dispatch')
+class AnnouncementCategoryView(KeysetPaginationMixin, View):
     pk_url_kwarg = 'category_id'
     template_name = 'bulletinboard/announcement_category.html'
 
     def get(self, request, category_id, *args, **kwargs):
         context = {}
-        category = models.Post.objects.filter(category__pk=category_id)
-        context['announcement_categories'] = category
+        page = self.paginate(models.Post.objects.publish().with_related().filter(category__pk=category_id))
+        context['announcement_categories'] = page.object_list
+        context['page'] = page
+        return render(request, self.template_name, context)
+
+
+@method_decorator(replica_reads, name='dispatch')
+class FilterView(KeysetPaginationMixin, View):
+    '''
+        posts filtered by category, price range and date with facet counts, paged by cursor
+    '''
+    template_name = 'bulletinboard/filter.html'
+
+    def get(self, request, *args, **kwargs):
+        categories = category_choices()
+        form = FilterForm(request.GET, categories=categories)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form}, status=400)
+        filters = form.cleaned_data
+        self.ordering = SORTS[filters['sort']]
+        # joined to auth_user, a price ordered page gets planned as a scan of the users
+        page = self.paginate(filter_posts(filters))
+        prefetch_related_objects(page.object_list, 'author', 'category')
+        facets = facet_counts(filters)
+        context = {
+            'form': form,
+            'announcements': page.object_list,
+            'page': page,
+            'total': facets['total'],
+            'category_facets': [
+                (name, facets['categories'].get(pk, 0), self.query(category=pk), pk == filters['category'])
+                for pk, name in categories
+            ],
+            'price_facets': [
+                (low, high, count, self.query(min_price=low, max_price=high),
+                 (low, high) == (filters['min_price'], filters['max_price']))
+                for low, high, count in facets['prices']
+            ],
+        }
         return render(request, self.template_name, context)
 
+    def query(self, **changes):
+        # a facet link keeps the other filters and starts from the first page
+        params = {key: value for key, value in self.request.GET.items() if key not in ('after', 'before')}
+        params.update((key, '' if value is None else value) for key, value in changes.items())
+        return '?' + urlencode({key: value for key, value in params.items() if value != ''})
 
+
+class SearchView(View):
+    template_name = 'bulletinboard/search.html'
+    paginate_by = 20
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        try:
+            category_id = int(request.GET['category']) if request.GET.get('category') else None
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404("Invalid search parameters")
+        context = {'query': query, 'category_id': category_id, 'page_number': page,
+                   'categories_list': models.Category.objects.order_by('category_name')}
+        if query:
+            posts = search_posts(query, category_id=category_id, limit=self.paginate_by + 1,
+                                 offset=(page - 1) * self.paginate_by)
+            context['results'] = posts[:self.paginate_by]
+            context['has_next'] = len(posts) > self.paginate_by
+        return render(request, self.template_name, context)
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class ExportView(View):
+    '''
+        streams posts or comments as csv or jsonl, optionally gzipped, without loading them into memory
+    '''
+    content_types = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+
+    def get(self, request, *args, **kwargs):
+        form = ExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        data = form.cleaned_data
+        category = data['category']
+        filename = '{}-{}.{}'.format(data['kind'], timezone.localdate().isoformat(), data['format'])
+        response = StreamingHttpResponse(
+            export_stream(data['kind'], data['format'], compress=data['gzip'],
+                          category_id=category.pk if category else None, since=data['since'], until=data['until']),
+            content_type='application/gzip' if data['gzip'] else self.content_types[data['format']])
+        if data['gzip']:
+            filename += '.gz'
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
+
+
+class RejectedUploadsMixin:
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        if form.is_bound:
+            report_rejected_uploads(self.request, form)
+        return form
+
+
+@method_decorator(streamed_uploads, name='dispatch')
 class CreateAnnouncementView(CreateView):
     form_class = AnnouncementPostForm
     template_name = 'bulletinboard/create_announcement.html'
@@ -96,6 +323,7 @@ class CreateAnnouncementView(CreateView):
     @method_decorator(login_required)
     def post(self, request,  *args, **kwargs):
         form = self.form_class(request.POST, request.FILES)
+        report_rejected_uploads(request, form)
         context = {}
         if form.is_valid():
             post = form.save(commit=False)
@@ -111,7 +339,8 @@ class CreateAnnouncementView(CreateView):
             return render(request=request, template_name=self.template_name, context=context)
 
 
-class EditAnnouncementView(UpdateView):
+@method_decorator(streamed_uploads, name='dispatch')
+class EditAnnouncementView(RejectedUploadsMixin, UpdateView):
     model = models.Post
     pk_url_kwarg = 'post_id'
     template_name = 'bulletinboard/edit_announcement.html'
@@ -140,7 +369,6 @@ class DeleteAnnouncementView(DeleteView):
 
 from django.contrib.auth.views import LoginView
 from django.contrib.auth import authenticate, login, logout
-from django.http import Http404
 
 
 class LoginView(LoginView):
@@ -177,9 +405,8 @@ class SignupView(View):
         user_form = SignupForm(data=request.POST)
         registered = False
         if user_form.is_valid():
-            user = user_form.save(commit=True)
-            user.email = user_form.cleaned_data['email']
-            user.save()
+            # email is one of the form's fields, so this single save stores it
+            user_form.save(commit=True)
             registered = True
             return render(request, 'my_auth/signup.html',
                           {'registered': registered})
@@ -195,15 +422,24 @@ def logout_view(request):
     return redirect(reverse("bulletinboard:home"))
 
 
-class ProfileView(DetailView):
+@method_decorator(replica_reads, name='dispatch')
+class ProfileView(KeysetPaginationMixin, DetailView):
     model = Profile
     template_name = 'bulletinboard/profile.html'
 
     def get_object(self):
-        return get_object_or_404(Profile, user__id=self.kwargs['user_id'])
+        return get_object_or_404(Profile.objects.select_related('user'), user__id=self.kwargs['user_id'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = self.paginate(models.Post.objects.publish().with_related().filter(author_id=self.object.user_id))
+        context['posts'] = page.object_list
+        context['page'] = page
+        return context
 
 
-class EditProfileView(UpdateView):
+@method_decorator(streamed_uploads, name='dispatch')
+class EditProfileView(RejectedUploadsMixin, UpdateView):
     model = Profile
     form_class = UpdateProfileForm
     template_name = 'bulletinboard/edit_profile.html'
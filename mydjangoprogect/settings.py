@@ -42,23 +42,37 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bulletinboard.metrics.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bulletinboard.auth.CachedAuthenticationMiddleware',
+    'bulletinboard.routers.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'mydjangoprogect.urls'
 
+# Addresses allowed to scrape /metrics without a staff login. Behind the reverse proxy
+# REMOTE_ADDR is the proxy's address for every request, so it must never be listed here;
+# only a scraper reaching the app server directly should be
+METRICS_ALLOWED_IPS = []
+
+_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # the django backend, timing renders for bulletinboard.metrics
+        'BACKEND': 'bulletinboard.templating.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # compiled templates are kept in memory unless templates are being edited
+            'loaders': _TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', _TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -83,6 +97,71 @@ DATABASES = {
     }
 }
 
+# Opt-in production profile for SQLite (SQLITE_PRODUCTION=1). WAL lets readers go on while a
+# write is in progress, connections are kept between requests, and pragmas from
+# bulletinboard.sqlite are applied to every new connection. Run `manage.py sqlite_maintenance`
+# periodically to checkpoint the write-ahead log.
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION') == '1'
+SQLITE_PRAGMAS = {}
+
+if SQLITE_PRODUCTION:
+    from bulletinboard.sqlite import PRODUCTION_PRAGMAS
+
+    SQLITE_PRAGMAS = PRODUCTION_PRAGMAS
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# Read replica. Listing, detail, category and profile pages read bulletinboard models from
+# REPLICA_DATABASE unless the visitor wrote something in the last REPLICA_STICKY_SECONDS;
+# a replica that fails is skipped for REPLICA_RETRY_SECONDS. Locally a second SQLite file,
+# opened read-only and refreshed by `manage.py sync_replica`, stands in for the replica.
+DATABASE_ROUTERS = ['bulletinboard.routers.ReplicaRouter']
+REPLICA_DATABASE = None
+REPLICA_STICKY_SECONDS = 15
+REPLICA_RETRY_SECONDS = 30
+
+if os.environ.get('REPLICA_DATABASE_PATH'):
+    REPLICA_DATABASE = 'replica'
+    DATABASES[REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'file:{}?mode=ro'.format(os.environ['REPLICA_DATABASE_PATH']),
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+# Cache
+# Use a cache shared by all worker processes (memcached, redis, file based) in production,
+# the anonymous page cache and its invalidation tags live here.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+
+# Posts on the home page, kept in memory by every process (bulletinboard.feed). Processes
+# learn about each other's writes through a version in the default cache, so workers need
+# a shared cache backend to converge.
+HOME_FEED_SIZE = 8
+
+
+# Sessions and authentication
+# Sessions are read from the cache; a request that only moves the expiry date forward
+# writes the session row at most once per SESSION_WRITE_BEHIND seconds. Resolved users
+# are cached per session by bulletinboard.auth.CachedAuthenticationMiddleware.
+
+SESSION_ENGINE = 'bulletinboard.sessions'
+SESSION_SAVE_EVERY_REQUEST = True
+SESSION_WRITE_BEHIND = 5 * 60
+
+# Drop the first backend to turn off logging in by email
+AUTHENTICATION_BACKENDS = [
+    'bulletinboard.auth.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -122,6 +201,19 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic bundles and minifies the app's stylesheets, re-encodes its images, fingerprints
+# everything and writes .gz (and, with the brotli package, .br) siblings; the WSGI application
+# serves them from STATIC_ROOT through bulletinboard.assets.StaticFilesApp
+STATICFILES_STORAGE = 'bulletinboard.assets.PipelineStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Responsive image derivatives generated for announcement images and avatars
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+# Announcement images and avatars are streamed to disk by bulletinboard.uploads.ImageUploadHandler,
+# which drops files above UPLOAD_MAX_BYTES or whose header shows more than UPLOAD_MAX_PIXELS
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+UPLOAD_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
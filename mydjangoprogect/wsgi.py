@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mydjangoprogect.settings')
 
 application = get_wsgi_application()
+
+from bulletinboard.assets import StaticFilesApp  # noqa: E402
+from bulletinboard.feed import warm_home_feed  # noqa: E402
+
+# collected static files are answered before Django, with far-future caching
+application = StaticFilesApp(application, settings.STATIC_ROOT, settings.STATIC_URL)
+
+# the home page is served from memory, so every worker loads it before its first request
+warm_home_feed()